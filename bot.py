@@ -1,33 +1,48 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
+import functools
+import io
 import logging
 import os
 import re
+import shutil
 import subprocess
+import sys
+import threading
+import time
+from collections import Counter
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Awaitable, Callable, Mapping, NoReturn
 
 import discord
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from dotenv import load_dotenv
 
-from codeops import CodeOps, CodeOpsConfig, CodeOpsError, parse_task_id, parse_title_and_instructions
+from codeops import CodeOps, CodeOpsConfig, CodeOpsError, CodeTask, parse_task_id, parse_title_and_instructions
 from outreach_ops import OutreachOps, OutreachOpsConfig, OutreachOpsError
 
+try:
+    import pygit2
+except ImportError:  # optional: falls back to the git CLI
+    pygit2 = None
+
 
-load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 logger = logging.getLogger("kiroku-bot")
 
 
-@dataclass
+@dataclass(frozen=True)
 class BotConfig:
     discord_token: str
     command_prefix: str
-    admin_channel_ids: set[int]
-    allowed_user_ids: set[int]
+    admin_channel_ids: frozenset[int]
+    allowed_user_ids: frozenset[int]
+    admin_channels_label: str
+    allowed_users_label: str
     weekly_channel_id: int | None
     weekly_schedule_enabled: bool
     repo_path: Path
@@ -60,214 +75,386 @@ class BotConfig:
     search_provider: str
     serpapi_api_key: str | None
     bing_search_api_key: str | None
+    use_uvloop: bool
+    max_concurrent_mutations: int
+    eager_tasks: bool
+
 
+_TRUE_VALUES = frozenset({"1", "true", "yes", "on"})
 
-def _env_bool(name: str, default: bool) -> bool:
-    raw = os.getenv(name)
-    if raw is None:
+
+def _env_bool(env: Mapping[str, str], name: str, default: bool) -> bool:
+    # Blank values fall back to the default, matching how string settings are read.
+    raw = env.get(name, "").strip()
+    if not raw:
         return default
-    return raw.strip().lower() in {"1", "true", "yes", "on"}
+    return raw.lower() in _TRUE_VALUES
 
 
-def _parse_int_csv(value: str | None) -> set[int]:
+def _parse_int_csv(value: str | None) -> frozenset[int]:
     if not value:
-        return set()
-    out: set[int] = set()
-    for item in value.split(","):
-        item = item.strip()
-        if not item:
-            continue
-        if not item.isdigit():
-            raise ValueError(f"Invalid numeric ID in CSV: {item}")
-        out.add(int(item))
-    return out
+        return frozenset()
+    items = [item for item in map(str.strip, value.split(",")) if item]
+    if all(map(str.isdecimal, items)):
+        return frozenset(map(int, items))
+    bad = next(item for item in items if not item.isdecimal())
+    raise ValueError(f"Invalid numeric ID in CSV: {bad}")
+
+
+# BotConfig field -> (env var, default) for plain string settings.
+_STR_SETTINGS: dict[str, tuple[str, str]] = {
+    "command_prefix": ("BOT_COMMAND_PREFIX", "!kiroku"),
+    "base_branch": ("BASE_BRANCH", "main"),
+    "remote_name": ("GIT_REMOTE", "origin"),
+    "openai_model": ("OPENAI_MODEL", "gpt-4.1-mini"),
+    "openai_base_url": ("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+    "anthropic_model": ("ANTHROPIC_MODEL", "claude-3-5-sonnet-latest"),
+    "anthropic_base_url": ("ANTHROPIC_BASE_URL", "https://api.anthropic.com"),
+    "anthropic_version": ("ANTHROPIC_VERSION", "2023-06-01"),
+    "launch_agent_label": ("LAUNCH_AGENT_LABEL", "com.kiroku.bot"),
+    "outreach_sender_name": ("OUTREACH_SENDER_NAME", ""),
+    "outreach_sender_title": ("OUTREACH_SENDER_TITLE", ""),
+    "outreach_sender_email": ("OUTREACH_SENDER_EMAIL", ""),
+    "outreach_calendar_link": ("OUTREACH_CALENDAR_LINK", ""),
+    "outreach_sponsorship_page_url": ("OUTREACH_SPONSORSHIP_PAGE_URL", ""),
+    "outreach_cohort_date_window": ("OUTREACH_COHORT_DATE_WINDOW", ""),
+    "outreach_cohort_city": ("OUTREACH_COHORT_CITY", "Tokyo"),
+    "smtp_host": ("SMTP_HOST", "smtp.gmail.com"),
+    "smtp_user": ("SMTP_USER", ""),
+    "smtp_password": ("SMTP_PASSWORD", ""),
+    "search_provider": ("SEARCH_PROVIDER", ""),
+}
+
+# BotConfig field -> env var for settings that are None when unset.
+_OPTIONAL_STR_SETTINGS: dict[str, str] = {
+    "verify_command": "VERIFY_COMMAND",
+    "openai_api_key": "OPENAI_API_KEY",
+    "anthropic_api_key": "ANTHROPIC_API_KEY",
+    "serpapi_api_key": "SERPAPI_API_KEY",
+    "bing_search_api_key": "BING_SEARCH_API_KEY",
+}
 
 
 def load_config() -> BotConfig:
-    token = os.getenv("DISCORD_TOKEN", "").strip()
+    env = os.environ.copy()
+
+    def get_str(name: str, default: str = "") -> str:
+        return env.get(name, "").strip() or default
+
+    token = get_str("DISCORD_TOKEN")
     if not token:
         raise ValueError("DISCORD_TOKEN is required.")
 
-    admin_channels = _parse_int_csv(os.getenv("ADMIN_CHANNEL_IDS"))
+    admin_channels = _parse_int_csv(env.get("ADMIN_CHANNEL_IDS"))
     if not admin_channels:
         # Backward-compatible fallback to old CHANNEL_ID env
-        fallback = os.getenv("CHANNEL_ID", "").strip()
+        fallback = get_str("CHANNEL_ID")
         if fallback.isdigit():
-            admin_channels = {int(fallback)}
+            admin_channels = frozenset({int(fallback)})
 
-    allowed_users = _parse_int_csv(os.getenv("ALLOWED_USER_IDS"))
+    allowed_users = _parse_int_csv(env.get("ALLOWED_USER_IDS"))
 
-    weekly_channel_raw = os.getenv("WEEKLY_POST_CHANNEL_ID", "").strip() or os.getenv("CHANNEL_ID", "").strip()
+    weekly_channel_raw = get_str("WEEKLY_POST_CHANNEL_ID") or get_str("CHANNEL_ID")
     weekly_channel_id = int(weekly_channel_raw) if weekly_channel_raw.isdigit() else None
 
-    repo_path = Path(os.getenv("REPO_PATH", ".")).expanduser().resolve()
-    tasks_file = Path(os.getenv("TASKS_FILE", ".kiroku/tasks.json")).expanduser()
+    # abspath normalizes without the per-segment lstat calls that resolve() makes.
+    repo_path = Path(os.path.abspath(os.path.expanduser(get_str("REPO_PATH", "."))))
+    tasks_file = Path(get_str("TASKS_FILE", ".kiroku/tasks.json")).expanduser()
     if not tasks_file.is_absolute():
         tasks_file = repo_path / tasks_file
 
-    outreach_state_dir = Path(os.getenv("OUTREACH_STATE_DIR", ".kiroku/outreach")).expanduser()
+    outreach_state_dir = Path(get_str("OUTREACH_STATE_DIR", ".kiroku/outreach")).expanduser()
     if not outreach_state_dir.is_absolute():
         outreach_state_dir = repo_path / outreach_state_dir
-    website_dir = (repo_path / "website").resolve()
+    website_dir = repo_path / "website"
 
-    smtp_port_raw = os.getenv("SMTP_PORT", "465").strip()
+    smtp_port_raw = get_str("SMTP_PORT", "465")
     smtp_port = int(smtp_port_raw) if smtp_port_raw.isdigit() else 465
 
+    max_concurrent_raw = get_str("KIROKU_MAX_CONCURRENT", "2")
+    max_concurrent_mutations = int(max_concurrent_raw) if max_concurrent_raw.isdigit() else 2
+
+    strs = {field: get_str(name, default) for field, (name, default) in _STR_SETTINGS.items()}
+    optional_strs = {field: get_str(name) or None for field, name in _OPTIONAL_STR_SETTINGS.items()}
+
     return BotConfig(
+        **strs,
+        **optional_strs,
         discord_token=token,
-        command_prefix=os.getenv("BOT_COMMAND_PREFIX", "!kiroku").strip() or "!kiroku",
         admin_channel_ids=admin_channels,
         allowed_user_ids=allowed_users,
+        admin_channels_label=",".join(map(str, sorted(admin_channels))) or "ALL",
+        allowed_users_label=",".join(map(str, sorted(allowed_users))) or "ALL_IN_ADMIN_CHANNEL",
         weekly_channel_id=weekly_channel_id,
-        weekly_schedule_enabled=_env_bool("ENABLE_WEEKLY_EVENTS", bool(weekly_channel_id)),
+        weekly_schedule_enabled=_env_bool(env, "ENABLE_WEEKLY_EVENTS", bool(weekly_channel_id)),
         repo_path=repo_path,
         tasks_file=tasks_file,
-        base_branch=os.getenv("BASE_BRANCH", "main").strip() or "main",
-        remote_name=os.getenv("GIT_REMOTE", "origin").strip() or "origin",
-        verify_command=(os.getenv("VERIFY_COMMAND", "").strip() or None),
-        openai_api_key=(os.getenv("OPENAI_API_KEY", "").strip() or None),
-        openai_model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini").strip() or "gpt-4.1-mini",
-        openai_base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").strip() or "https://api.openai.com/v1",
-        anthropic_api_key=(os.getenv("ANTHROPIC_API_KEY", "").strip() or None),
-        anthropic_model=os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-latest").strip() or "claude-3-5-sonnet-latest",
-        anthropic_base_url=os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com").strip()
-        or "https://api.anthropic.com",
-        anthropic_version=os.getenv("ANTHROPIC_VERSION", "2023-06-01").strip() or "2023-06-01",
-        launch_agent_label=os.getenv("LAUNCH_AGENT_LABEL", "com.kiroku.bot").strip() or "com.kiroku.bot",
         outreach_state_dir=outreach_state_dir,
         website_dir=website_dir,
-        outreach_sender_name=os.getenv("OUTREACH_SENDER_NAME", "").strip(),
-        outreach_sender_title=os.getenv("OUTREACH_SENDER_TITLE", "").strip(),
-        outreach_sender_email=os.getenv("OUTREACH_SENDER_EMAIL", "").strip(),
-        outreach_calendar_link=os.getenv("OUTREACH_CALENDAR_LINK", "").strip(),
-        outreach_sponsorship_page_url=os.getenv("OUTREACH_SPONSORSHIP_PAGE_URL", "").strip(),
-        outreach_cohort_date_window=os.getenv("OUTREACH_COHORT_DATE_WINDOW", "").strip(),
-        outreach_cohort_city=os.getenv("OUTREACH_COHORT_CITY", "Tokyo").strip() or "Tokyo",
-        smtp_host=os.getenv("SMTP_HOST", "smtp.gmail.com").strip() or "smtp.gmail.com",
         smtp_port=smtp_port,
-        smtp_user=os.getenv("SMTP_USER", "").strip(),
-        smtp_password=os.getenv("SMTP_PASSWORD", "").strip(),
-        outreach_send_enabled=_env_bool("OUTREACH_SEND_ENABLED", False),
-        search_provider=os.getenv("SEARCH_PROVIDER", "").strip(),
-        serpapi_api_key=(os.getenv("SERPAPI_API_KEY", "").strip() or None),
-        bing_search_api_key=(os.getenv("BING_SEARCH_API_KEY", "").strip() or None),
+        outreach_send_enabled=_env_bool(env, "OUTREACH_SEND_ENABLED", False),
+        use_uvloop=_env_bool(env, "KIROKU_USE_UVLOOP", False),
+        max_concurrent_mutations=max(1, max_concurrent_mutations),
+        eager_tasks=_env_bool(env, "KIROKU_EAGER_TASKS", False),
     )
 
 
-CONFIG = load_config()
+@functools.lru_cache(maxsize=1)
+def get_config() -> BotConfig:
+    # Read .env and the environment on first use rather than at import.
+    load_dotenv()
+    return load_config()
+
+
+@functools.lru_cache(maxsize=1)
+def _command_prefix() -> tuple[str, re.Pattern[str]]:
+    # Lowercased prefix for the per-line check, plus a case-insensitive prefilter for the whole message.
+    prefix = get_config().command_prefix
+    return prefix.lower(), re.compile(re.escape(prefix), re.IGNORECASE)
+
 
+_TASK_ID_RE = re.compile(r"#(\d+)")
+_TASK_ID_PREFIX_RE = re.compile(r"^#?\d+\b")
+_FIRST_SMALL_INT_RE = re.compile(r"\b(\d{1,4})\b")
 
-intents = discord.Intents.default()
+
+# Only subscribe to the gateway events the bot actually handles (guild cache + messages),
+# so Discord doesn't stream reactions, typing, voice, invites, etc. through the client.
+intents = discord.Intents.none()
+intents.guilds = True
+intents.guild_messages = True
+intents.dm_messages = True
 intents.message_content = True
 bot = discord.Client(intents=intents)
 scheduler = AsyncIOScheduler()
 
-ops = CodeOps(
-    CodeOpsConfig(
-        repo_path=CONFIG.repo_path,
-        tasks_file=CONFIG.tasks_file,
-        base_branch=CONFIG.base_branch,
-        remote_name=CONFIG.remote_name,
-        openai_api_key=CONFIG.openai_api_key,
-        openai_model=CONFIG.openai_model,
-        openai_base_url=CONFIG.openai_base_url,
-        anthropic_api_key=CONFIG.anthropic_api_key,
-        anthropic_model=CONFIG.anthropic_model,
-        anthropic_base_url=CONFIG.anthropic_base_url,
-        anthropic_version=CONFIG.anthropic_version,
-        verify_command=CONFIG.verify_command,
+@functools.lru_cache(maxsize=1)
+def get_ops() -> CodeOps:
+    return CodeOps(
+        CodeOpsConfig(
+            repo_path=get_config().repo_path,
+            tasks_file=get_config().tasks_file,
+            base_branch=get_config().base_branch,
+            remote_name=get_config().remote_name,
+            openai_api_key=get_config().openai_api_key,
+            openai_model=get_config().openai_model,
+            openai_base_url=get_config().openai_base_url,
+            anthropic_api_key=get_config().anthropic_api_key,
+            anthropic_model=get_config().anthropic_model,
+            anthropic_base_url=get_config().anthropic_base_url,
+            anthropic_version=get_config().anthropic_version,
+            verify_command=get_config().verify_command,
+        )
     )
-)
 
-outreach = OutreachOps(
-    OutreachOpsConfig(
-        state_dir=CONFIG.outreach_state_dir,
-        website_dir=CONFIG.website_dir,
-        sender_name=CONFIG.outreach_sender_name,
-        sender_title=CONFIG.outreach_sender_title,
-        sender_email=CONFIG.outreach_sender_email,
-        calendar_link=CONFIG.outreach_calendar_link,
-        sponsorship_page_url=CONFIG.outreach_sponsorship_page_url,
-        cohort_date_window=CONFIG.outreach_cohort_date_window,
-        cohort_city=CONFIG.outreach_cohort_city,
-        smtp_host=CONFIG.smtp_host,
-        smtp_port=CONFIG.smtp_port,
-        smtp_user=CONFIG.smtp_user,
-        smtp_password=CONFIG.smtp_password,
-        send_enabled=CONFIG.outreach_send_enabled,
-        search_provider=CONFIG.search_provider,
-        serpapi_api_key=CONFIG.serpapi_api_key or "",
-        bing_api_key=CONFIG.bing_search_api_key or "",
+
+@functools.lru_cache(maxsize=1)
+def get_outreach() -> OutreachOps:
+    return OutreachOps(
+        OutreachOpsConfig(
+            state_dir=get_config().outreach_state_dir,
+            website_dir=get_config().website_dir,
+            sender_name=get_config().outreach_sender_name,
+            sender_title=get_config().outreach_sender_title,
+            sender_email=get_config().outreach_sender_email,
+            calendar_link=get_config().outreach_calendar_link,
+            sponsorship_page_url=get_config().outreach_sponsorship_page_url,
+            cohort_date_window=get_config().outreach_cohort_date_window,
+            cohort_city=get_config().outreach_cohort_city,
+            smtp_host=get_config().smtp_host,
+            smtp_port=get_config().smtp_port,
+            smtp_user=get_config().smtp_user,
+            smtp_password=get_config().smtp_password,
+            send_enabled=get_config().outreach_send_enabled,
+            search_provider=get_config().search_provider,
+            serpapi_api_key=get_config().serpapi_api_key or "",
+            bing_api_key=get_config().bing_search_api_key or "",
+        )
     )
-)
 
-READ_COMMANDS = {"help", "status", "tasks", "show", "preview", "repo", "id", "ping"}
-MUTATING_COMMANDS = {
-    "task",
-    "plan",
-    "diff",
-    "apply",
-    "commit",
-    "pr",
-    "run",
-    "merge",
-    "deploy",
-    "ship",
-    "outreach",
-    "do",
-}
+
+@functools.lru_cache(maxsize=1)
+def _mutate_sem() -> asyncio.Semaphore:
+    # Caps how many mutating commands (git + LLM work) run at once across all messages.
+    # Built on first use so it binds to the running loop (Python 3.9 binds at construction).
+    return asyncio.Semaphore(get_config().max_concurrent_mutations)
+
+
+@functools.lru_cache(maxsize=1)
+def _worktree_lock() -> asyncio.Lock:
+    # Commands that check out branches or commit in the shared working tree must not interleave:
+    # CodeOps releases its own worktree lock between apply and commit, so a second task's
+    # checkout would carry the first task's staged patch onto its branch. Lazy for the same
+    # loop-binding reason as _mutate_sem().
+    return asyncio.Lock()
+
+
+_WORKTREE_COMMANDS = frozenset({"apply", "commit", "pr", "run", "merge", "deploy", "ship"})
 
 
 def _is_admin_channel(channel_id: int) -> bool:
-    if not CONFIG.admin_channel_ids:
-        return True
-    return channel_id in CONFIG.admin_channel_ids
+    channels = get_config().admin_channel_ids
+    return not channels or channel_id in channels
 
 
 def _is_allowed_user(user_id: int) -> bool:
-    if not CONFIG.allowed_user_ids:
-        # Bootstrap mode: if explicit allow-list is not configured yet,
-        # allow mutating commands only in admin channels.
-        return True
-    return user_id in CONFIG.allowed_user_ids
+    # Bootstrap mode: if explicit allow-list is not configured yet,
+    # allow mutating commands only in admin channels.
+    users = get_config().allowed_user_ids
+    return not users or user_id in users
+
+
+# Discord rejects messages over 2000 chars; pack each send as close to that as possible.
+_MESSAGE_LIMIT = 1990
 
 
 async def _send_chunks(channel: discord.abc.Messageable, text: str) -> None:
     data = text.strip() or "(empty)"
-    chunk_size = 1800
-    parts = [data[i : i + chunk_size] for i in range(0, len(data), chunk_size)]
-    for part in parts:
-        await channel.send(part)
+    chunk_size = _MESSAGE_LIMIT
+    if len(data) <= chunk_size:
+        await channel.send(data)
+        return
+    start, total = 0, len(data)
+    while start < total:
+        end = start + chunk_size
+        if end < total:
+            # Prefer splitting on a line boundary so patch previews don't tear lines.
+            nl = data.rfind("\n", start, end)
+            if nl > start:
+                end = nl + 1
+        await channel.send(data[start:end])
+        start = end
+
+
+async def _send_file(channel: discord.abc.Messageable, path: Path) -> None:
+    # Read off the event loop; discord.File would otherwise open and read the CSV inline.
+    data = await asyncio.to_thread(path.read_bytes)
+    await channel.send(file=discord.File(io.BytesIO(data), filename=path.name))
+
+
+async def _git_output(*args: str) -> str:
+    proc = await asyncio.create_subprocess_exec(
+        "git",
+        "-C",
+        str(get_config().repo_path),
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    stdout, _ = await proc.communicate()
+    return stdout.decode("utf-8", errors="replace").strip()
 
 
-def _repo_overview() -> str:
-    branch = subprocess.run(
-        ["git", "-C", str(CONFIG.repo_path), "branch", "--show-current"],
-        capture_output=True,
-        text=True,
-        check=False,
-    ).stdout.strip()
-    dirty = subprocess.run(
-        ["git", "-C", str(CONFIG.repo_path), "status", "--porcelain"],
-        capture_output=True,
-        text=True,
-        check=False,
-    ).stdout.strip()
+@functools.lru_cache(maxsize=1)
+def _pygit2_repo():
+    return pygit2.Repository(str(get_config().repo_path))
+
+
+# A pygit2.Repository is not safe for concurrent use; overlapping to_thread calls share the cached one.
+_PYGIT2_LOCK = threading.Lock()
+
+
+def _pygit2_branch_and_dirty() -> tuple[str, bool]:
+    with _PYGIT2_LOCK:
+        repo = _pygit2_repo()
+        try:
+            branch = "" if repo.head_is_detached else repo.head.shorthand
+        except pygit2.GitError:
+            # Unborn branch (no commits yet).
+            branch = ""
+        return branch, bool(repo.status())
+
+
+def _parse_status_branch(header: str) -> str:
+    # First line of `git status -b --porcelain`, e.g. "## main...origin/main [ahead 1]".
+    if not header.startswith("## "):
+        return ""
+    rest = header[3:]
+    for unborn in ("No commits yet on ", "Initial commit on "):
+        if rest.startswith(unborn):
+            return rest[len(unborn) :].strip()
+    if rest.startswith("HEAD (no branch)"):
+        return ""
+    return rest.split("...", 1)[0].split(" ", 1)[0]
+
+
+async def _git_cli_branch_and_dirty() -> tuple[str, bool]:
+    out = await _git_output("status", "-b", "--porcelain")
+    header, _, changes = out.partition("\n")
+    return _parse_status_branch(header), bool(changes.strip())
+
+
+@dataclass
+class _RepoOverviewCache:
+    text: str = ""
+    expires: float = 0.0
+    generation: int = 0
+
+    def invalidate(self) -> None:
+        self.expires = 0.0
+        self.generation += 1
+
+
+# Mutating commands invalidate this; the TTL only covers edits made outside the bot.
+_REPO_OVERVIEW_TTL = 30.0
+_REPO_OVERVIEW_CACHE = _RepoOverviewCache()
+
+
+async def _repo_overview() -> str:
+    now = time.monotonic()
+    if now < _REPO_OVERVIEW_CACHE.expires:
+        return _REPO_OVERVIEW_CACHE.text
+    generation = _REPO_OVERVIEW_CACHE.generation
+    text = await _build_repo_overview()
+    # Don't store a snapshot that a mutating command invalidated while we were reading.
+    if generation == _REPO_OVERVIEW_CACHE.generation:
+        _REPO_OVERVIEW_CACHE.text = text
+        _REPO_OVERVIEW_CACHE.expires = now + _REPO_OVERVIEW_TTL
+    return text
+
+
+async def _build_repo_overview() -> str:
+    if pygit2 is None:
+        branch, dirty = await _git_cli_branch_and_dirty()
+    else:
+        try:
+            branch, dirty = await asyncio.to_thread(_pygit2_branch_and_dirty)
+        except pygit2.GitError:
+            logger.warning("pygit2 could not read %s; falling back to git CLI", get_config().repo_path)
+            branch, dirty = await _git_cli_branch_and_dirty()
     return (
-        f"repo={CONFIG.repo_path}\n"
+        f"repo={get_config().repo_path}\n"
         f"branch={branch or 'unknown'}\n"
         f"dirty={'yes' if dirty else 'no'}\n"
-        f"tasks_file={CONFIG.tasks_file}"
+        f"tasks_file={get_config().tasks_file}"
     )
 
 
+def _line_count(text: str) -> int:
+    if not text:
+        return 0
+    return text.count("\n") + (0 if text.endswith("\n") else 1)
+
+
+def _head_lines(text: str, limit: int) -> str:
+    # Slice up to the limit-th newline instead of splitting the whole text.
+    end = 0
+    for _ in range(limit):
+        nl = text.find("\n", end)
+        if nl < 0:
+            return text[: end - 1] if end == len(text) else text
+        end = nl + 1
+    return text[: end - 1] if end else ""
+
+
 def _task_summary_line(task) -> str:
     return f"#{task.task_id} [{task.status}] {task.title} (branch: {task.branch})"
 
 
-async def _handle_help(message: discord.Message) -> None:
-    text = (
-        f"Kiroku commands ({CONFIG.command_prefix} ...):\n"
+@functools.lru_cache(maxsize=1)
+def _help_text() -> str:
+    return (
+        f"Kiroku commands ({get_config().command_prefix} ...):\n"
         "- help\n"
         "- ping\n"
         "- status\n"
@@ -289,33 +476,32 @@ async def _handle_help(message: discord.Message) -> None:
         "- outreach help\n"
         "- do <freeform request> (shortcut for common outreach workflows)\n"
     )
-    await _send_chunks(message.channel, text)
 
 
-async def _handle_ping(message: discord.Message) -> None:
-    await message.reply("pong")
+async def _handle_help(message: discord.Message, args: str) -> None:
+    await _send_chunks(message.channel, _help_text())
 
 
-async def _handle_status(message: discord.Message) -> None:
-    tasks = await ops.list_tasks(include_closed=False)
-    total = len(tasks)
-    by_status: dict[str, int] = {}
-    for task in tasks:
-        by_status[task.status] = by_status.get(task.status, 0) + 1
+async def _handle_ping(message: discord.Message, args: str) -> None:
+    await message.reply("pong")
+
 
-    status_line = " ".join(f"{k}={v}" for k, v in sorted(by_status.items()))
+async def _handle_status(message: discord.Message, args: str) -> None:
+    tasks = await get_ops().list_tasks(include_closed=False)
+    by_status = Counter(task.status for task in tasks)
+    status_line = " ".join([f"{k}={v}" for k, v in sorted(by_status.items())])
     model_status = (
-        f"anthropic:{CONFIG.anthropic_model}"
-        if CONFIG.anthropic_api_key
-        else (f"openai:{CONFIG.openai_model}" if CONFIG.openai_api_key else "missing LLM key")
+        f"anthropic:{get_config().anthropic_model}"
+        if get_config().anthropic_api_key
+        else (f"openai:{get_config().openai_model}" if get_config().openai_api_key else "missing LLM key")
     )
     text = (
         "Kiroku status\n"
-        f"command_prefix={CONFIG.command_prefix}\n"
-        f"admin_channels={','.join(str(x) for x in sorted(CONFIG.admin_channel_ids)) or 'ALL'}\n"
-        f"allowed_users={','.join(str(x) for x in sorted(CONFIG.allowed_user_ids)) or 'ALL_IN_ADMIN_CHANNEL'}\n"
+        f"command_prefix={get_config().command_prefix}\n"
+        f"admin_channels={get_config().admin_channels_label}\n"
+        f"allowed_users={get_config().allowed_users_label}\n"
         f"model={model_status}\n"
-        f"tasks_open={total}\n"
+        f"tasks_open={len(tasks)}\n"
         f"task_statuses={status_line or 'none'}"
     )
     await _send_chunks(message.channel, text)
@@ -323,48 +509,49 @@ async def _handle_status(message: discord.Message) -> None:
 
 async def _handle_tasks(message: discord.Message, args: str) -> None:
     include_all = args.strip().lower() == "all"
-    tasks = await ops.list_tasks(include_closed=include_all)
+    tasks = await get_ops().list_tasks(include_closed=include_all)
     if not tasks:
         await _send_chunks(message.channel, "No tasks found.")
         return
 
-    lines = [_task_summary_line(task) for task in tasks[:20]]
+    body = "\n".join(_task_summary_line(task) for task in tasks[:20])
     suffix = "\n(truncated to latest 20 tasks)" if len(tasks) > 20 else ""
-    await _send_chunks(message.channel, "Tasks:\n" + "\n".join(lines) + suffix)
+    await _send_chunks(message.channel, f"Tasks:\n{body}{suffix}")
 
 
 async def _handle_show(message: discord.Message, args: str) -> None:
-    task = await ops.get_task(parse_task_id(args.strip()))
+    task = await get_ops().get_task(parse_task_id(args.strip()))
+    files = ", ".join(task.files) if task.files else "n/a"
+    instructions = task.instructions[:1200]
     text = (
         f"Task #{task.task_id}\n"
         f"status={task.status}\n"
         f"title={task.title}\n"
         f"requested_by={task.requested_by} ({task.requested_by_id})\n"
         f"branch={task.branch}\n"
-        f"files={', '.join(task.files) if task.files else 'n/a'}\n"
+        f"files={files}\n"
         f"commit={task.commit_sha or 'n/a'}\n"
         f"compare_url={task.compare_url or 'n/a'}\n"
         f"updated_at={task.updated_at}\n"
-        f"instructions:\n{task.instructions[:1200]}"
+        f"instructions:\n{instructions}"
     )
     await _send_chunks(message.channel, text)
 
 
 async def _handle_preview(message: discord.Message, args: str) -> None:
-    task = await ops.get_task(parse_task_id(args.strip()))
+    task = await get_ops().get_task(parse_task_id(args.strip()))
     if not task.patch.strip():
         await _send_chunks(message.channel, f"Task #{task.task_id} has no patch yet.")
         return
 
-    lines = task.patch.splitlines()
-    preview = "\n".join(lines[:120])
-    suffix = "\n... (truncated)" if len(lines) > 120 else ""
+    preview = _head_lines(task.patch, 120)
+    suffix = "\n... (truncated)" if _line_count(task.patch) > 120 else ""
     await _send_chunks(message.channel, f"Patch preview for task #{task.task_id}:\n{preview}{suffix}")
 
 
 async def _handle_task_create(message: discord.Message, args: str) -> None:
     title, instructions = parse_title_and_instructions(args)
-    task = await ops.create_task(
+    task = await get_ops().create_task(
         title=title,
         instructions=instructions,
         requested_by=str(message.author),
@@ -375,28 +562,28 @@ async def _handle_task_create(message: discord.Message, args: str) -> None:
 
 async def _handle_plan(message: discord.Message, args: str) -> None:
     task_id = parse_task_id(args.strip())
-    task = await ops.plan_task(task_id)
+    task = await get_ops().plan_task(task_id)
     body = task.plan.strip() or "(empty plan)"
     await _send_chunks(message.channel, f"Planned {_task_summary_line(task)}\n\n{body[:4000]}")
 
 
 async def _handle_diff(message: discord.Message, args: str) -> None:
     task_id = parse_task_id(args.strip())
-    task = await ops.patch_task(task_id)
-    lines = task.patch.splitlines()
-    preview = "\n".join(lines[:80])
-    suffix = "\n... (truncated)" if len(lines) > 80 else ""
+    task = await get_ops().patch_task(task_id)
+    total_lines = _line_count(task.patch)
+    preview = _head_lines(task.patch, 80)
+    suffix = "\n... (truncated)" if total_lines > 80 else ""
     await _send_chunks(
         message.channel,
         f"Generated patch for {_task_summary_line(task)}\n"
-        f"patch_lines={len(lines)}\n"
+        f"patch_lines={total_lines}\n"
         f"preview:\n{preview}{suffix}",
     )
 
 
 async def _handle_apply(message: discord.Message, args: str) -> None:
     task_id = parse_task_id(args.strip())
-    task = await ops.apply_task(task_id)
+    task = await get_ops().apply_task(task_id)
     await _send_chunks(message.channel, f"Applied {_task_summary_line(task)}")
 
 
@@ -408,7 +595,7 @@ async def _handle_commit(message: discord.Message, args: str) -> None:
     first, _, rest = raw.partition(" ")
     task_id = parse_task_id(first)
     commit_message = rest.strip() or None
-    task = await ops.commit_task(task_id, commit_message)
+    task = await get_ops().commit_task(task_id, commit_message)
     await _send_chunks(
         message.channel,
         f"Committed {_task_summary_line(task)}\nsha={task.commit_sha}",
@@ -417,7 +604,7 @@ async def _handle_commit(message: discord.Message, args: str) -> None:
 
 async def _handle_pr(message: discord.Message, args: str) -> None:
     task_id = parse_task_id(args.strip())
-    task = await ops.publish_task(task_id)
+    task = await get_ops().publish_task(task_id)
     await _send_chunks(
         message.channel,
         f"Published {_task_summary_line(task)}\n"
@@ -425,29 +612,70 @@ async def _handle_pr(message: discord.Message, args: str) -> None:
     )
 
 
+class _ProgressMessage:
+    """A single Discord message edited in place as pipeline stages complete."""
+
+    def __init__(self, channel: discord.abc.Messageable) -> None:
+        self._channel = channel
+        self._lines: list[str] = []
+        self._message: discord.Message | None = None
+        self._pending: asyncio.Task | None = None
+
+    def add(self, line: str) -> None:
+        # Chain edits so they stay ordered without blocking the pipeline on Discord acks.
+        self._lines.append(line)
+        content = "\n".join(self._lines)[-_MESSAGE_LIMIT:]
+        self._pending = asyncio.create_task(self._flush(self._pending, content))
+
+    async def _flush(self, previous: asyncio.Task | None, content: str) -> None:
+        if previous is not None:
+            await previous
+        # Progress is cosmetic: a deleted message or a Discord 5xx must not replace the stage's
+        # own error (which is what marks the task failed) or fail a pipeline that succeeded.
+        try:
+            if self._message is None:
+                self._message = await self._channel.send(content)
+            else:
+                await self._message.edit(content=content)
+        except discord.HTTPException:
+            logger.warning("progress update failed", exc_info=True)
+
+    async def wait(self) -> None:
+        # Called from `finally`; never raises so it can't mask the pipeline's exception.
+        if self._pending is None:
+            return
+        try:
+            await self._pending
+        except Exception:
+            logger.exception("progress update failed")
+
+
 async def _handle_run(message: discord.Message, args: str) -> None:
     task_id = parse_task_id(args.strip())
-    await _send_chunks(message.channel, f"Running end-to-end pipeline for task #{task_id} ...")
+    progress = _ProgressMessage(message.channel)
+    progress.add(f"Running end-to-end pipeline for task #{task_id} ...")
+    try:
+        task = await get_ops().plan_task(task_id)
+        progress.add(f"1/5 planned: {_task_summary_line(task)}")
 
-    task = await ops.plan_task(task_id)
-    await _send_chunks(message.channel, f"1/5 planned: {_task_summary_line(task)}")
+        task = await get_ops().patch_task(task_id)
+        progress.add(f"2/5 patch generated: lines={_line_count(task.patch)}")
 
-    task = await ops.patch_task(task_id)
-    await _send_chunks(message.channel, f"2/5 patch generated: lines={len(task.patch.splitlines())}")
+        task = await get_ops().apply_task(task_id)
+        progress.add(f"3/5 patch applied: {_task_summary_line(task)}")
 
-    task = await ops.apply_task(task_id)
-    await _send_chunks(message.channel, f"3/5 patch applied: {_task_summary_line(task)}")
+        task = await get_ops().commit_task(task_id)
+        progress.add(f"4/5 committed: sha={task.commit_sha}")
 
-    task = await ops.commit_task(task_id)
-    await _send_chunks(message.channel, f"4/5 committed: sha={task.commit_sha}")
+        task = await get_ops().publish_task(task_id)
+        progress.add(f"5/5 published: {task.compare_url}")
+    finally:
+        await progress.wait()
 
-    task = await ops.publish_task(task_id)
-    await _send_chunks(message.channel, f"5/5 published: {task.compare_url}")
 
-
-def _git_run(args: list[str]) -> str:
+def _git_run_sync(args: list[str]) -> str:
     proc = subprocess.run(
-        ["git", "-C", str(CONFIG.repo_path), *args],
+        ["git", "-C", str(get_config().repo_path), *args],
         capture_output=True,
         text=True,
         check=False,
@@ -457,75 +685,91 @@ def _git_run(args: list[str]) -> str:
     return proc.stdout.strip()
 
 
-def _ensure_clean_worktree() -> None:
-    dirty = _git_run(["status", "--porcelain"])
+async def _git_run(args: list[str]) -> str:
+    return await asyncio.to_thread(_git_run_sync, args)
+
+
+async def _ensure_clean_worktree() -> None:
+    dirty = await _git_run(["status", "--porcelain"])
     if dirty.strip():
         raise CodeOpsError("Repo is dirty; refusing operation. Clean working tree first.")
 
 
 async def _handle_merge(message: discord.Message, args: str) -> None:
     task_id = parse_task_id(args.strip())
-    _ensure_clean_worktree()
-    await _send_chunks(message.channel, f"Merging task #{task_id} into `{CONFIG.base_branch}` ...")
-    task = await ops.merge_task(task_id)
-    await _send_chunks(message.channel, f"Merged #{task.task_id} into `{CONFIG.base_branch}`.")
+    await _ensure_clean_worktree()
+    await _send_chunks(message.channel, f"Merging task #{task_id} into `{get_config().base_branch}` ...")
+    task = await get_ops().merge_task(task_id)
+    await _send_chunks(message.channel, f"Merged #{task.task_id} into `{get_config().base_branch}`.")
+
+
+@functools.lru_cache(maxsize=1)
+def _launchctl() -> str | None:
+    return shutil.which("launchctl")
 
 
 async def _handle_deploy(message: discord.Message, args: str) -> None:
     raw = (args or "").strip()
     if raw.strip().upper() != "--CONFIRM DEPLOY":
         raise CodeOpsError("Usage: deploy --confirm DEPLOY")
+    launchctl = _launchctl()
+    if launchctl is None:
+        raise CodeOpsError("launchctl not found; deploy only works under a macOS LaunchAgent.")
 
-    _ensure_clean_worktree()
+    await _ensure_clean_worktree()
 
     await _send_chunks(
         message.channel,
         (
-            f"Deploying: pulling `{CONFIG.base_branch}` and restarting bot (launch agent `{CONFIG.launch_agent_label}`).\n"
+            f"Deploying: pulling `{get_config().base_branch}` and restarting bot (launch agent `{get_config().launch_agent_label}`).\n"
             "If the bot goes silent for a few seconds, that's expected."
         ),
     )
 
     # Pull latest main before restart.
-    _git_run(["checkout", CONFIG.base_branch])
-    _git_run(["pull", "--ff-only", CONFIG.remote_name, CONFIG.base_branch])
+    await _git_run(["checkout", get_config().base_branch])
+    await _git_run(["pull", "--ff-only", get_config().remote_name, get_config().base_branch])
 
     # Kickstart after the reply is sent.
     await asyncio.sleep(1.0)
-    label = f"gui/{os.getuid()}/{CONFIG.launch_agent_label}"
-    subprocess.Popen(["launchctl", "kickstart", "-k", label])
-
-
-def _strip_confirm_flag(raw: str, *, expected: str) -> tuple[str, bool]:
-    parts = (raw or "").split()
-    if "--confirm" not in parts:
-        return (raw or "").strip(), False
-    idx = parts.index("--confirm")
-    token = parts[idx + 1] if idx + 1 < len(parts) else ""
-    ok = token.strip().upper() == expected.upper()
-    kept = parts[:idx] + parts[idx + 2 :]
-    return " ".join(kept).strip(), ok
+    label = f"gui/{os.getuid()}/{get_config().launch_agent_label}"
+    # Fire-and-forget: no pipes or Popen object needed, launchctl is about to restart us.
+    os.posix_spawn(launchctl, ["launchctl", "kickstart", "-k", label], os.environ)
+
+
+def _strip_confirm_flag(raw: str, *, expected: str) -> tuple[list[str], bool]:
+    # Returns the remaining tokens so callers don't have to re-split the joined text.
+    tokens = iter((raw or "").split())
+    kept: list[str] = []
+    ok = False
+    for token in tokens:
+        if token == "--confirm" and not ok:
+            ok = next(tokens, "").upper() == expected.upper()
+            if not ok:
+                return kept, False
+        else:
+            kept.append(token)
+    return kept, ok
 
 
 async def _handle_ship(message: discord.Message, args: str) -> None:
-    stripped, ok = _strip_confirm_flag(args, expected="SHIP")
+    kept, ok = _strip_confirm_flag(args, expected="SHIP")
     if not ok:
         raise CodeOpsError("Refusing to ship without `--confirm SHIP`.")
 
-    _ensure_clean_worktree()
+    await _ensure_clean_worktree()
 
-    raw = stripped.strip()
-    if not raw:
+    if not kept:
         raise CodeOpsError("Usage: ship <id|title> || <instructions> --confirm SHIP")
 
     # Either ship an existing task id, or create a new task from the message.
-    first = raw.split()[0]
+    first = kept[0]
     task_id: int
-    if re.match(r"^#?\\d+\\b", first):
+    if _TASK_ID_PREFIX_RE.match(first):
         task_id = parse_task_id(first)
     else:
-        title, instructions = parse_title_and_instructions(raw)
-        task = await ops.create_task(
+        title, instructions = parse_title_and_instructions(" ".join(kept))
+        task = await get_ops().create_task(
             title=title,
             instructions=instructions,
             requested_by=str(message.author),
@@ -534,29 +778,33 @@ async def _handle_ship(message: discord.Message, args: str) -> None:
         task_id = task.task_id
         await _send_chunks(message.channel, f"Created {_task_summary_line(task)}")
 
-    await _send_chunks(message.channel, f"Shipping task #{task_id} (run+merge+deploy) ...")
+    progress = _ProgressMessage(message.channel)
+    progress.add(f"Shipping task #{task_id} (run+merge+deploy) ...")
+    try:
+        task = await get_ops().plan_task(task_id)
+        progress.add(f"1/7 planned: {_task_summary_line(task)}")
 
-    task = await ops.plan_task(task_id)
-    await _send_chunks(message.channel, f"1/7 planned: {_task_summary_line(task)}")
+        task = await get_ops().patch_task(task_id)
+        progress.add(f"2/7 patch generated: lines={_line_count(task.patch)}")
 
-    task = await ops.patch_task(task_id)
-    await _send_chunks(message.channel, f"2/7 patch generated: lines={len(task.patch.splitlines())}")
+        task = await get_ops().apply_task(task_id)
+        progress.add(f"3/7 patch applied: {_task_summary_line(task)}")
 
-    task = await ops.apply_task(task_id)
-    await _send_chunks(message.channel, f"3/7 patch applied: {_task_summary_line(task)}")
+        task = await get_ops().commit_task(task_id)
+        progress.add(f"4/7 committed: sha={task.commit_sha}")
 
-    task = await ops.commit_task(task_id)
-    await _send_chunks(message.channel, f"4/7 committed: sha={task.commit_sha}")
+        task = await get_ops().publish_task(task_id)
+        progress.add(f"5/7 published: {task.compare_url}")
 
-    task = await ops.publish_task(task_id)
-    await _send_chunks(message.channel, f"5/7 published: {task.compare_url}")
+        task = await get_ops().merge_task(task_id)
+        progress.add(f"6/7 merged into `{get_config().base_branch}`")
 
-    task = await ops.merge_task(task_id)
-    await _send_chunks(message.channel, f"6/7 merged into `{CONFIG.base_branch}`")
-
-    await _send_chunks(message.channel, f"7/7 deploying (restart) ...")
+        progress.add("7/7 deploying (restart) ...")
+    finally:
+        await progress.wait()
     await _handle_deploy(message, "--confirm DEPLOY")
 
+
 def _resolve_outreach_path(arg: str) -> Path:
     raw = (arg or "").strip()
     if not raw:
@@ -567,29 +815,69 @@ def _resolve_outreach_path(arg: str) -> Path:
         return p
     # If user passes a bare filename, default to outreach state dir.
     if "/" not in raw and "\\" not in raw:
-        return (CONFIG.outreach_state_dir / raw).resolve()
-    return (CONFIG.repo_path / p).resolve()
+        return Path(os.path.abspath(get_config().outreach_state_dir / raw))
+    return Path(os.path.abspath(get_config().repo_path / p))
+
+
+class _FlagParser(argparse.ArgumentParser):
+    """ArgumentParser that reports bad flags as OutreachOpsError instead of exiting."""
+
+    def __init__(self) -> None:
+        super().__init__(add_help=False, allow_abbrev=False)
+
+    def error(self, message: str) -> NoReturn:
+        raise OutreachOpsError(message)
+
+
+def _count_arg(value: str) -> int:
+    if not value.isdigit():
+        raise argparse.ArgumentTypeError("requires a number.")
+    return int(value)
+
+
+_LIST_PARSER = _FlagParser()
+_LIST_PARSER.add_argument("--limit", type=_count_arg, default=20)
+_LIST_PARSER.add_argument("--unsent-only", dest="unsent_only", action="store_const", const=True, default=True)
+_LIST_PARSER.add_argument("--all", dest="unsent_only", action="store_const", const=False)
+
+_APPROVE_PARSER = _FlagParser()
+_APPROVE_PARSER.add_argument("--all", dest="approve_all", action="store_true")
+_APPROVE_PARSER.add_argument("--first", type=_count_arg, default=0)
+_APPROVE_PARSER.add_argument("--ids", default="")
+
+_SEND_PARSER = _FlagParser()
+_SEND_PARSER.add_argument("--limit", type=_count_arg, default=10)
+_SEND_PARSER.add_argument("--dry-run", dest="dry_run", action="store_const", const=True, default=True)
+_SEND_PARSER.add_argument("--send", dest="dry_run", action="store_const", const=False)
+_SEND_PARSER.add_argument("--approved-only", dest="approved_only", action="store_const", const=True, default=True)
+_SEND_PARSER.add_argument("--all", dest="approved_only", action="store_const", const=False)
+_SEND_PARSER.add_argument("--confirm", default="")
+
+
+@functools.lru_cache(maxsize=1)
+def _outreach_help_text() -> str:
+    prefix = get_config().command_prefix
+    return (
+        "Outreach ops\n"
+        "Usage:\n"
+        f"- {prefix} outreach config\n"
+        f"- {prefix} outreach generate housing <count>\n"
+        f"- {prefix} outreach draft <leads_csv_path>\n"
+        f"- {prefix} outreach list <outbox_csv_path> [--limit N] [--unsent-only|--all]\n"
+        f"- {prefix} outreach approve <outbox_csv_path> (--all | --first N | --ids 1,2,3)\n"
+        f"- {prefix} outreach send <outbox_csv_path> [--limit N] [--dry-run|--send] [--approved-only|--all] [--confirm SEND]\n"
+        "\n"
+        "Notes:\n"
+        "- Lead generation requires SEARCH_PROVIDER + API key (SERPAPI_API_KEY or BING_SEARCH_API_KEY).\n"
+        "- Sending requires SMTP_* + OUTREACH_SEND_ENABLED=true.\n"
+        "- `send` defaults to dry-run; use `--send --confirm SEND` to actually send.\n"
+    )
 
 
 async def _handle_outreach(message: discord.Message, args: str) -> None:
     raw = (args or "").strip()
     if not raw or raw.lower() == "help":
-        text = (
-            "Outreach ops\n"
-            "Usage:\n"
-            f"- {CONFIG.command_prefix} outreach config\n"
-            f"- {CONFIG.command_prefix} outreach generate housing <count>\n"
-            f"- {CONFIG.command_prefix} outreach draft <leads_csv_path>\n"
-            f"- {CONFIG.command_prefix} outreach list <outbox_csv_path> [--limit N] [--unsent-only|--all]\n"
-            f"- {CONFIG.command_prefix} outreach approve <outbox_csv_path> (--all | --first N | --ids 1,2,3)\n"
-            f"- {CONFIG.command_prefix} outreach send <outbox_csv_path> [--limit N] [--dry-run|--send] [--approved-only|--all] [--confirm SEND]\n"
-            "\n"
-            "Notes:\n"
-            "- Lead generation requires SEARCH_PROVIDER + API key (SERPAPI_API_KEY or BING_SEARCH_API_KEY).\n"
-            "- Sending requires SMTP_* + OUTREACH_SEND_ENABLED=true.\n"
-            "- `send` defaults to dry-run; use `--send --confirm SEND` to actually send.\n"
-        )
-        await _send_chunks(message.channel, text)
+        await _send_chunks(message.channel, _outreach_help_text())
         return
 
     sub, _, rest = raw.partition(" ")
@@ -597,7 +885,7 @@ async def _handle_outreach(message: discord.Message, args: str) -> None:
     rest = rest.strip()
 
     if sub == "config":
-        await _send_chunks(message.channel, outreach.config_summary())
+        await _send_chunks(message.channel, get_outreach().config_summary())
         return
 
     if sub == "generate":
@@ -610,19 +898,19 @@ async def _handle_outreach(message: discord.Message, args: str) -> None:
         if not parts[1].isdigit():
             raise OutreachOpsError("count must be a number, e.g. `100`.")
         count = int(parts[1])
-        await _send_chunks(message.channel, f"Generating {count} housing leads (search_provider={CONFIG.search_provider or 'missing'}) ...")
-        leads_path = await outreach.generate_housing_leads(count, city=CONFIG.outreach_cohort_city or "Tokyo", country="Japan")
+        await _send_chunks(message.channel, f"Generating {count} housing leads (search_provider={get_config().search_provider or 'missing'}) ...")
+        leads_path = await get_outreach().generate_housing_leads(count, city=get_config().outreach_cohort_city or "Tokyo", country="Japan")
         await _send_chunks(message.channel, f"Leads written: {leads_path.name}")
-        await message.channel.send(file=discord.File(str(leads_path)))
+        await _send_file(message.channel, leads_path)
         return
 
     if sub == "draft":
         if not rest:
             raise OutreachOpsError("Usage: outreach draft <leads_csv_path>")
         leads_path = _resolve_outreach_path(rest)
-        outbox_path = outreach.draft_housing_emails(leads_path)
+        outbox_path = await asyncio.to_thread(get_outreach().draft_housing_emails, leads_path)
         await _send_chunks(message.channel, f"Drafted emails written: {outbox_path.name} (approve rows by setting approved=yes)")
-        await message.channel.send(file=discord.File(str(outbox_path)))
+        await _send_file(message.channel, outbox_path)
         return
 
     if sub == "list":
@@ -631,29 +919,11 @@ async def _handle_outreach(message: discord.Message, args: str) -> None:
             raise OutreachOpsError("Usage: outreach list <outbox_csv_path> [--limit N] [--unsent-only|--all]")
 
         outbox_path = _resolve_outreach_path(parts[0])
-        limit = 20
-        unsent_only = True
-
-        i = 1
-        while i < len(parts):
-            token = parts[i]
-            if token == "--limit":
-                if i + 1 >= len(parts) or not parts[i + 1].isdigit():
-                    raise OutreachOpsError("--limit requires a number.")
-                limit = int(parts[i + 1])
-                i += 2
-                continue
-            if token == "--unsent-only":
-                unsent_only = True
-                i += 1
-                continue
-            if token == "--all":
-                unsent_only = False
-                i += 1
-                continue
-            raise OutreachOpsError(f"Unknown flag: {token}")
+        flags = _LIST_PARSER.parse_args(parts[1:])
 
-        preview = outreach.list_outbox(outbox_path, limit=limit, unsent_only=unsent_only)
+        preview = await asyncio.to_thread(
+            get_outreach().list_outbox, outbox_path, limit=flags.limit, unsent_only=flags.unsent_only
+        )
         await _send_chunks(message.channel, preview)
         return
 
@@ -663,33 +933,18 @@ async def _handle_outreach(message: discord.Message, args: str) -> None:
             raise OutreachOpsError("Usage: outreach approve <outbox_csv_path> (--all | --first N | --ids 1,2,3)")
 
         outbox_path = _resolve_outreach_path(parts[0])
-        approve_all = False
-        first = 0
-        ids: set[str] = set()
-
-        i = 1
-        while i < len(parts):
-            token = parts[i]
-            if token == "--all":
-                approve_all = True
-                i += 1
-                continue
-            if token == "--first":
-                if i + 1 >= len(parts) or not parts[i + 1].isdigit():
-                    raise OutreachOpsError("--first requires a number.")
-                first = int(parts[i + 1])
-                i += 2
-                continue
-            if token == "--ids":
-                raw_ids = parts[i + 1] if i + 1 < len(parts) else ""
-                ids = {x.strip() for x in raw_ids.split(",") if x.strip()}
-                i += 2
-                continue
-            raise OutreachOpsError(f"Unknown flag: {token}")
+        flags = _APPROVE_PARSER.parse_args(parts[1:])
+        ids = {x.strip() for x in flags.ids.split(",") if x.strip()}
 
-        approved = outreach.approve_outbox(outbox_path, approve_all=approve_all, first=first, ids=ids or None)
+        approved = await asyncio.to_thread(
+            get_outreach().approve_outbox,
+            outbox_path,
+            approve_all=flags.approve_all,
+            first=flags.first,
+            ids=ids or None,
+        )
         await _send_chunks(message.channel, f"Approved {approved} outbox rows: {outbox_path.name}")
-        await message.channel.send(file=discord.File(str(outbox_path)))
+        await _send_file(message.channel, outbox_path)
         return
 
     if sub == "send":
@@ -698,46 +953,17 @@ async def _handle_outreach(message: discord.Message, args: str) -> None:
             raise OutreachOpsError("Usage: outreach send <outbox_csv_path> [--limit N] [--dry-run|--send] [--approved-only|--all] [--confirm SEND]")
 
         outbox_path = _resolve_outreach_path(parts[0])
-        limit = 10
-        dry_run = True
-        approved_only = True
-        confirm = ""
-
-        i = 1
-        while i < len(parts):
-            token = parts[i]
-            if token == "--limit":
-                if i + 1 >= len(parts) or not parts[i + 1].isdigit():
-                    raise OutreachOpsError("--limit requires a number.")
-                limit = int(parts[i + 1])
-                i += 2
-                continue
-            if token == "--dry-run":
-                dry_run = True
-                i += 1
-                continue
-            if token == "--send":
-                dry_run = False
-                i += 1
-                continue
-            if token == "--approved-only":
-                approved_only = True
-                i += 1
-                continue
-            if token == "--all":
-                approved_only = False
-                i += 1
-                continue
-            if token == "--confirm":
-                confirm = parts[i + 1] if i + 1 < len(parts) else ""
-                i += 2
-                continue
-            raise OutreachOpsError(f"Unknown flag: {token}")
+        flags = _SEND_PARSER.parse_args(parts[1:])
+        limit = flags.limit
+        dry_run = flags.dry_run
+        approved_only = flags.approved_only
 
-        if not dry_run and confirm.strip().upper() != "SEND":
+        if not dry_run and flags.confirm.strip().upper() != "SEND":
             raise OutreachOpsError("Refusing to send without `--confirm SEND`.")
 
-        attempted, sent, skipped_missing_email, _ = outreach.send_outbox(
+        # CSV I/O and SMTP are blocking; keep them off the event loop.
+        attempted, sent, skipped_missing_email, _ = await asyncio.to_thread(
+            get_outreach().send_outbox,
             outbox_path,
             limit=limit,
             dry_run=dry_run,
@@ -751,10 +977,10 @@ async def _handle_outreach(message: discord.Message, args: str) -> None:
                 f"attempted={attempted} sent={sent} skipped_missing_email={skipped_missing_email}"
             ),
         )
-        await message.channel.send(file=discord.File(str(outbox_path)))
+        await _send_file(message.channel, outbox_path)
         return
 
-    raise OutreachOpsError(f"Unknown outreach subcommand `{sub}`. Use `{CONFIG.command_prefix} outreach help`.")
+    raise OutreachOpsError(f"Unknown outreach subcommand `{sub}`. Use `{get_config().command_prefix} outreach help`.")
 
 
 async def _handle_do(message: discord.Message, args: str) -> None:
@@ -765,8 +991,8 @@ async def _handle_do(message: discord.Message, args: str) -> None:
     lower = text.lower()
     # Heuristic parser for the common request shape.
     count = 50
-    m = re.search(r"\\b(\\d{1,4})\\b", lower)
-    if m and m.group(1).isdigit():
+    m = _FIRST_SMALL_INT_RE.search(lower)
+    if m:
         count = int(m.group(1))
 
     if "housing" not in lower and "hotel" not in lower and "accommodation" not in lower:
@@ -776,8 +1002,8 @@ async def _handle_do(message: discord.Message, args: str) -> None:
         )
 
     await _send_chunks(message.channel, f"Running outreach pipeline (housing, count={count}) ...")
-    leads_path = await outreach.generate_housing_leads(count, city=CONFIG.outreach_cohort_city or "Tokyo", country="Japan")
-    outbox_path = outreach.draft_housing_emails(leads_path)
+    leads_path = await get_outreach().generate_housing_leads(count, city=get_config().outreach_cohort_city or "Tokyo", country="Japan")
+    outbox_path = await asyncio.to_thread(get_outreach().draft_housing_emails, leads_path)
     await _send_chunks(
         message.channel,
         (
@@ -786,98 +1012,158 @@ async def _handle_do(message: discord.Message, args: str) -> None:
             f"- Draft outbox: {outbox_path.name}\n"
             "\n"
             "Next steps:\n"
-            f"1) Preview: {CONFIG.command_prefix} outreach list {outbox_path.name} --limit 10\n"
-            f"2) Approve (example): {CONFIG.command_prefix} outreach approve {outbox_path.name} --first 5\n"
-            f"3) Dry-run: {CONFIG.command_prefix} outreach send {outbox_path.name} --limit 5 --dry-run\n"
-            f"4) Send: {CONFIG.command_prefix} outreach send {outbox_path.name} --limit 5 --send --confirm SEND"
+            f"1) Preview: {get_config().command_prefix} outreach list {outbox_path.name} --limit 10\n"
+            f"2) Approve (example): {get_config().command_prefix} outreach approve {outbox_path.name} --first 5\n"
+            f"3) Dry-run: {get_config().command_prefix} outreach send {outbox_path.name} --limit 5 --dry-run\n"
+            f"4) Send: {get_config().command_prefix} outreach send {outbox_path.name} --limit 5 --send --confirm SEND"
         ),
     )
-    await message.channel.send(file=discord.File(str(leads_path)))
-    await message.channel.send(file=discord.File(str(outbox_path)))
+    # Independent uploads; run both multipart POSTs at once.
+    await asyncio.gather(
+        _send_file(message.channel, leads_path),
+        _send_file(message.channel, outbox_path),
+    )
+
+
+async def _handle_repo(message: discord.Message, args: str) -> None:
+    await _send_chunks(message.channel, await _repo_overview())
+
+
+async def _handle_id(message: discord.Message, args: str) -> None:
+    guild_id = message.guild.id if message.guild else "n/a"
+    text = (
+        f"user_id={message.author.id}\n"
+        f"channel_id={message.channel.id}\n"
+        f"guild_id={guild_id}"
+    )
+    await _send_chunks(message.channel, text)
+
+
+_CommandHandler = Callable[[discord.Message, str], Awaitable[None]]
+
+@functools.lru_cache(maxsize=1)
+def _unknown_cmd_hint() -> str:
+    return f". Use `{get_config().command_prefix} help`."
+
+_READ_HANDLERS: dict[str, _CommandHandler] = {
+    "help": _handle_help,
+    "ping": _handle_ping,
+    "status": _handle_status,
+    "tasks": _handle_tasks,
+    "show": _handle_show,
+    "preview": _handle_preview,
+    "repo": _handle_repo,
+    "id": _handle_id,
+}
+_MUTATING_HANDLERS: dict[str, _CommandHandler] = {
+    "task": _handle_task_create,
+    "plan": _handle_plan,
+    "diff": _handle_diff,
+    "apply": _handle_apply,
+    "commit": _handle_commit,
+    "pr": _handle_pr,
+    "run": _handle_run,
+    "merge": _handle_merge,
+    "deploy": _handle_deploy,
+    "ship": _handle_ship,
+    "outreach": _handle_outreach,
+    "do": _handle_do,
+}
+READ_COMMANDS = _READ_HANDLERS.keys()
+MUTATING_COMMANDS = _MUTATING_HANDLERS.keys()
+# Commands where a repeat in the same message means "do it again", so they're never deduplicated.
+_REPEATABLE_COMMANDS = frozenset({"task", "do", "run"})
+
+
+async def _run_mutating(handler: _CommandHandler, message: discord.Message, args: str) -> None:
+    async with _mutate_sem():
+        try:
+            await handler(message, args)
+        finally:
+            _REPO_OVERVIEW_CACHE.invalidate()
 
 
 async def _dispatch_command(message: discord.Message, command: str, args: str) -> None:
-    cmd = command.lower().strip()
-
-    if cmd in READ_COMMANDS:
-        if cmd == "help":
-            await _handle_help(message)
-        elif cmd == "ping":
-            await _handle_ping(message)
-        elif cmd == "status":
-            await _handle_status(message)
-        elif cmd == "tasks":
-            await _handle_tasks(message, args)
-        elif cmd == "show":
-            await _handle_show(message, args)
-        elif cmd == "preview":
-            await _handle_preview(message, args)
-        elif cmd == "repo":
-            await _send_chunks(message.channel, _repo_overview())
-        elif cmd == "id":
-            guild_id = message.guild.id if message.guild else "n/a"
-            text = (
-                f"user_id={message.author.id}\n"
-                f"channel_id={message.channel.id}\n"
-                f"guild_id={guild_id}"
-            )
-            await _send_chunks(message.channel, text)
+    cmd = command.lower()
+
+    handler = _READ_HANDLERS.get(cmd)
+    if handler is not None:
+        await handler(message, args)
         return
 
-    if cmd in MUTATING_COMMANDS:
+    handler = _MUTATING_HANDLERS.get(cmd)
+    if handler is not None:
         if not _is_allowed_user(message.author.id):
             await _send_chunks(message.channel, f"Unauthorized: <@{message.author.id}> cannot run `{cmd}`.")
             return
-
-        if cmd == "task":
-            await _handle_task_create(message, args)
-        elif cmd == "plan":
-            await _handle_plan(message, args)
-        elif cmd == "diff":
-            await _handle_diff(message, args)
-        elif cmd == "apply":
-            await _handle_apply(message, args)
-        elif cmd == "commit":
-            await _handle_commit(message, args)
-        elif cmd == "pr":
-            await _handle_pr(message, args)
-        elif cmd == "run":
-            await _handle_run(message, args)
-        elif cmd == "merge":
-            await _handle_merge(message, args)
-        elif cmd == "deploy":
-            await _handle_deploy(message, args)
-        elif cmd == "ship":
-            await _handle_ship(message, args)
-        elif cmd == "outreach":
-            await _handle_outreach(message, args)
-        elif cmd == "do":
-            await _handle_do(message, args)
+        if cmd in _WORKTREE_COMMANDS:
+            # Taken before the semaphore so a queued git command doesn't hold a slot others could use.
+            async with _worktree_lock():
+                await _run_mutating(handler, message, args)
+        else:
+            await _run_mutating(handler, message, args)
         return
 
-    await _send_chunks(message.channel, f"Unknown command `{cmd}`. Use `{CONFIG.command_prefix} help`.")
+    await _send_chunks(message.channel, f"Unknown command `{cmd}`{_unknown_cmd_hint()}")
+
+
+async def _run_command(message: discord.Message, command: str, args: str) -> None:
+    try:
+        await _dispatch_command(message, command, args)
+    except (CodeOpsError, OutreachOpsError) as exc:
+        msg = str(exc)
+        m = _TASK_ID_RE.search(args) or _TASK_ID_RE.search(command)
+        if m:
+            try:
+                await get_ops().fail_task(int(m.group(1)), msg)
+            except Exception:
+                pass
+        await _send_chunks(message.channel, f"Command failed: {msg}")
+    except Exception as exc:
+        logger.exception("Unhandled command error")
+        await _send_chunks(message.channel, f"Unhandled error: {exc}")
+
+
+async def _run_commands(message: discord.Message, commands: list[tuple[str, str]], split: int) -> None:
+    if split:
+        await asyncio.gather(*(_run_command(message, command, args) for command, args in commands[:split]))
+    for command, args in commands[split:]:
+        await _run_command(message, command, args)
+
+
+def _install_eager_task_factory() -> None:
+    if not get_config().eager_tasks:
+        return
+    eager_factory = getattr(asyncio, "eager_task_factory", None)
+    if eager_factory is None:
+        logger.warning("KIROKU_EAGER_TASKS is set but asyncio.eager_task_factory needs Python 3.12+.")
+        return
+    loop = asyncio.get_running_loop()
+    if loop.get_task_factory() is None:
+        loop.set_task_factory(eager_factory)
+        logger.info("eager task factory enabled")
 
 
 @bot.event
 async def on_ready() -> None:
     logger.info("%s connected", bot.user)
-    logger.info("admin channels: %s", sorted(CONFIG.admin_channel_ids) if CONFIG.admin_channel_ids else "ALL")
-    logger.info(
-        "allowed users: %s",
-        sorted(CONFIG.allowed_user_ids) if CONFIG.allowed_user_ids else "ALL_IN_ADMIN_CHANNEL",
-    )
-    logger.info("repo path: %s", CONFIG.repo_path)
-    logger.info("tasks file: %s", CONFIG.tasks_file)
+    logger.info("admin channels: %s", get_config().admin_channels_label)
+    logger.info("allowed users: %s", get_config().allowed_users_label)
+    logger.info("repo path: %s", get_config().repo_path)
+    logger.info("tasks file: %s", get_config().tasks_file)
+    _install_eager_task_factory()
 
-    if CONFIG.weekly_schedule_enabled and CONFIG.weekly_channel_id and not scheduler.running:
+    if get_config().weekly_schedule_enabled and get_config().weekly_channel_id and not scheduler.running:
         scheduler.add_job(
             post_weekly_update,
             CronTrigger(day_of_week=0, hour=9, minute=0),
             id="weekly_events",
             replace_existing=True,
+            misfire_grace_time=3600,
+            coalesce=True,
         )
         scheduler.start()
-        logger.info("weekly scheduler started for channel=%s", CONFIG.weekly_channel_id)
+        logger.info("weekly scheduler started for channel=%s", get_config().weekly_channel_id)
 
 
 @bot.event
@@ -893,12 +1179,16 @@ async def on_message(message: discord.Message) -> None:
     #   !kiroku status
     #   !kiroku outreach config
     raw_content = message.content or ""
-    lines = [ln.strip() for ln in raw_content.splitlines() if ln.strip()]
+    # Most channel chatter never mentions the prefix; bail out before splitting lines.
+    prefix_lower, prefix_re = _command_prefix()
+    if not prefix_re.search(raw_content):
+        return
     commands: list[tuple[str, str]] = []
-    for ln in lines:
-        if not ln.lower().startswith(CONFIG.command_prefix.lower()):
+    for ln in raw_content.splitlines():
+        ln = ln.strip()
+        if ln[: len(prefix_lower)].lower() != prefix_lower:
             continue
-        payload = ln[len(CONFIG.command_prefix) :].strip()
+        payload = ln[len(prefix_lower) :].strip()
         if not payload:
             commands.append(("help", ""))
             continue
@@ -907,54 +1197,104 @@ async def on_message(message: discord.Message) -> None:
         args = parts[1] if len(parts) > 1 else ""
         commands.append((command, args))
 
+    # Drop repeated lines (e.g. a pasted `status` x5); commands that create work keep every copy.
+    seen: set[tuple[str, str]] = set()
+    deduped: list[tuple[str, str]] = []
+    for command, args in commands:
+        key = (command.lower(), args)
+        if key[0] not in _REPEATABLE_COMMANDS:
+            if key in seen:
+                continue
+            seen.add(key)
+        deduped.append((command, args))
+    commands = deduped
+
     if not commands:
         return
 
+    # Read-only commands at the start of the message are independent, so run them concurrently;
+    # everything from the first mutating command on stays sequential (plan -> diff -> apply chains).
+    split = 0
+    while split < len(commands) and commands[split][0].lower() in _READ_HANDLERS:
+        split += 1
+
+    if split == len(commands):
+        # Read-only commands answer almost immediately; skip the extra typing-indicator request.
+        await _run_commands(message, commands, split)
+        return
     async with message.channel.typing():
-        for command, args in commands:
-            try:
-                await _dispatch_command(message, command, args)
-            except (CodeOpsError, OutreachOpsError) as exc:
-                msg = str(exc)
-                m = re.search(r"#(\d+)", f"{command} {args}")
-                if m and m.group(1).isdigit():
-                    try:
-                        await ops.fail_task(int(m.group(1)), msg)
-                    except Exception:
-                        pass
-                await _send_chunks(message.channel, f"Command failed: {msg}")
-            except Exception as exc:
-                logger.exception("Unhandled command error")
-                await _send_chunks(message.channel, f"Unhandled error: {exc}")
+        await _run_commands(message, commands, split)
+
+
+_WEEKLY_EMBED = discord.Embed(
+    title="Weekly Kiroku Ops Update",
+    description=(
+        "Admin channel controls are live. Use `!kiroku help` in admin chat "
+        "to create tasks and run controlled code-change workflows."
+    ),
+    color=discord.Color.blurple(),
+)
+_WEEKLY_EMBED.add_field(
+    name="Ops Reminder",
+    value="All mutating commands are restricted to allowed users only.",
+    inline=False,
+)
+_WEEKLY_EMBED.set_footer(text="Kiroku Bot")
+
+
+_weekly_channel: discord.abc.Messageable | None = None
 
 
 async def post_weekly_update() -> None:
-    if not CONFIG.weekly_channel_id:
+    global _weekly_channel
+    if not get_config().weekly_channel_id:
+        return
+    if _weekly_channel is None:
+        # Resolve once; fall back to the API if the channel isn't in the gateway cache.
+        channel = bot.get_channel(get_config().weekly_channel_id)
+        if channel is None:
+            try:
+                channel = await bot.fetch_channel(get_config().weekly_channel_id)
+            except (discord.HTTPException, discord.InvalidData):
+                logger.error("Weekly channel not found: %s", get_config().weekly_channel_id)
+                return
+        _weekly_channel = channel
+
+    await _weekly_channel.send(embed=_WEEKLY_EMBED)
+
+
+def _install_uvloop() -> None:
+    if not get_config().use_uvloop or sys.platform == "win32":
         return
-    channel = bot.get_channel(CONFIG.weekly_channel_id)
-    if channel is None:
-        logger.error("Weekly channel not found: %s", CONFIG.weekly_channel_id)
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("KIROKU_USE_UVLOOP is set but uvloop is not installed; using the default event loop.")
         return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("using uvloop event loop policy")
 
-    embed = discord.Embed(
-        title="Weekly Kiroku Ops Update",
-        description=(
-            "Admin channel controls are live. Use `!kiroku help` in admin chat "
-            "to create tasks and run controlled code-change workflows."
-        ),
-        color=discord.Color.blurple(),
-    )
-    embed.add_field(
-        name="Ops Reminder",
-        value="All mutating commands are restricted to allowed users only.",
-        inline=False,
-    )
-    embed.set_footer(text="Kiroku Bot")
-    await channel.send(embed=embed)
+
+async def _serve() -> None:
+    # Build the ops backends up front so a misconfigured repo fails before connecting. This runs
+    # inside the loop because their asyncio locks bind to the current loop on Python 3.9.
+    get_ops()
+    get_outreach()
+    # Same lifecycle as bot.run(), plus closing the shared HTTP sessions on the way out.
+    try:
+        async with bot:
+            await bot.start(get_config().discord_token)
+    finally:
+        await get_ops().aclose()
+        await get_outreach().aclose()
 
 
 def run_bot() -> None:
-    bot.run(CONFIG.discord_token)
+    _install_uvloop()
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
@@ -1,12 +1,11 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 import os
 import re
 import shlex
-import subprocess
-import tempfile
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
@@ -14,6 +13,48 @@ from typing import Any
 
 import aiohttp
 
+try:
+    import orjson
+except ImportError:  # optional: stdlib json fallback
+    orjson = None
+
+try:
+    import pygit2
+except ImportError:  # optional: git CLI fallback
+    pygit2 = None
+
+
+def _json_loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_dumps(payload: Any) -> bytes:
+    # Compact on purpose: inline patches make the store large, and indenting it on every save adds up.
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+_FILE_CANDIDATE_RE = re.compile(r"[A-Za-z0-9_./-]+\.(?:py|md|json|yaml|yml|toml|js|ts|html|css|gs)")
+_DIFF_GIT_RE = re.compile(r"(?m)^diff --git\s")
+_DIFF_MINUS_RE = re.compile(r"(?m)^---\s")
+_DIFF_PLUS_RE = re.compile(r"(?m)^\+\+\+\s")
+_DIFF_MINUS_A_RE = re.compile(r"(?m)^---\sa/")
+_DIFF_INDEX_LINE_RE = re.compile(r"(?m)^index [^\n]*\n?")
+_FENCED_DIFF_RE = re.compile(r"```(?:diff)?\s*\n(.*?)```", re.S)
+_PLACEHOLDER_RE = re.compile(r"<[^>]+>")
+_SSH_REMOTE_RE = re.compile(r"git@[^:]+:([^\s]+?)(?:\.git)?$")
+_HTTPS_REMOTE_RE = re.compile(r"https?://[^/]+/([^\s]+?)(?:\.git)?$")
+_TASK_ID_RE = re.compile(r"^#?([0-9]+)(?=$|[^0-9A-Za-z_])")
+_DIFF_START_RE = re.compile(r"(?m)^(?:diff --git\s|---\s|```)")
+
+# How much streamed patch output to inspect before giving up on a prose-only reply.
+_PATCH_SNIFF_CHARS = 200
+_PLAN_MAX_TOKENS = 1500
+_PATCH_MAX_TOKENS = 4000
+
 
 TASK_STATUS_NEW = "new"
 TASK_STATUS_PLANNED = "planned"
@@ -56,7 +97,7 @@ class CodeTask:
             "updated_at": self.updated_at,
             "plan": self.plan,
             "patch": self.patch,
-            "files": self.files,
+            "files": list(self.files),
             "commit_sha": self.commit_sha,
             "compare_url": self.compare_url,
             "last_error": self.last_error,
@@ -105,6 +146,85 @@ class CodeOpsError(RuntimeError):
     pass
 
 
+class GitBatchReader:
+    """
+    Long-lived `git cat-file --batch-check` process for ref/object lookups.
+
+    Resolving a rev is a line round-trip on the pipe instead of a fork+exec per call.
+    """
+
+    def __init__(self, repo_path: Path):
+        self.repo_path = repo_path
+        self._proc: asyncio.subprocess.Process | None = None
+        # One request/response in flight on the pipe at a time; created lazily inside the loop.
+        self._lock: asyncio.Lock | None = None
+
+    async def _ensure_proc(self) -> asyncio.subprocess.Process:
+        if self._proc is None or self._proc.returncode is not None:
+            self._proc = await asyncio.create_subprocess_exec(
+                "git",
+                "cat-file",
+                "--batch-check",
+                cwd=self.repo_path,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        return self._proc
+
+    async def _query(self, rev: str) -> str:
+        proc = await self._ensure_proc()
+        assert proc.stdin is not None and proc.stdout is not None
+        try:
+            proc.stdin.write(rev.encode("utf-8") + b"\n")
+            await proc.stdin.drain()
+            line = await proc.stdout.readline()
+        except BaseException:
+            # A cancelled or broken round-trip leaves the pipe out of sync; start over next time.
+            self._discard()
+            raise
+        if not line:
+            self._discard()
+            raise BrokenPipeError("git cat-file exited")
+        return line.decode("utf-8", errors="replace").strip()
+
+    async def resolve(self, rev: str) -> str | None:
+        """Return the object id for `rev`, or None if it does not exist."""
+        rev = rev.strip()
+        if not rev or "\n" in rev:
+            return None
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                try:
+                    line = await self._query(rev)
+                except OSError:
+                    # Process died (e.g. repo moved); respawn once.
+                    line = await self._query(rev)
+            except OSError as exc:
+                raise CodeOpsError(f"git cat-file failed for {rev}: {exc}") from exc
+        if line.endswith(" missing") or line.endswith(" ambiguous"):
+            return None
+        return line.split(" ", 1)[0]
+
+    def _discard(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+
+    async def aclose(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None or proc.returncode is not None:
+            return
+        if proc.stdin is not None:
+            proc.stdin.close()
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            proc.kill()
+
+
 class CodeOps:
     def __init__(self, config: CodeOpsConfig):
         self.config = config
@@ -112,7 +232,20 @@ class CodeOps:
         self.config.tasks_file = self.config.tasks_file.resolve()
         self.config.tasks_file.parent.mkdir(parents=True, exist_ok=True)
         self._ensure_git_repo()
+        self._git_reader = GitBatchReader(self.config.repo_path)
+        self._tracked_cache: tuple[tuple[int, int, int], frozenset[str]] | None = None
+        # In-memory copy of the task store plus an id -> task dict index into it.
+        self._payload: dict[str, Any] | None = None
+        self._payload_stamp: tuple[int, int, int] | None = None
+        self._task_index: dict[int, dict[str, Any]] = {}
+        self._http: aiohttp.ClientSession | None = None
+        self._remote_slug_cache: str | None = None
+        # Lock order: per-task lock -> worktree lock -> state lock.
+        # _state_lock only guards task-store reads/writes, so LLM calls on different tasks overlap;
+        # _worktree_lock serializes checkout/apply/commit/push in the shared working tree.
         self._state_lock = asyncio.Lock()
+        self._worktree_lock = asyncio.Lock()
+        self._task_locks: dict[int, asyncio.Lock] = {}
         self._init_store_if_missing()
 
     def _ensure_git_repo(self) -> None:
@@ -120,47 +253,40 @@ class CodeOps:
         if not git_dir.exists():
             raise CodeOpsError(f"Not a git repository: {self.config.repo_path}")
 
-    def _run(self, cmd: list[str], check: bool = True) -> str:
-        proc = subprocess.run(
-            cmd,
+    async def _run_async(self, cmd: list[str], check: bool = True, input: bytes | None = None) -> str:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
             cwd=self.config.repo_path,
-            text=True,
-            capture_output=True,
-            check=False,
+            stdin=asyncio.subprocess.PIPE if input is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
+        out, err = await proc.communicate(input)
+        stdout = out.decode("utf-8", errors="replace").strip()
         if check and proc.returncode != 0:
-            raise CodeOpsError(
-                f"Command failed ({' '.join(cmd)}): {proc.stderr.strip() or proc.stdout.strip()}"
-            )
-        return proc.stdout.strip()
+            stderr = err.decode("utf-8", errors="replace").strip()
+            raise CodeOpsError(f"Command failed ({' '.join(cmd)}): {stderr or stdout}")
+        return stdout
 
-    def _branch_exists(self, branch: str) -> bool:
+    async def _branch_exists(self, branch: str) -> bool:
         if not branch.strip():
             return False
-        proc = subprocess.run(
-            ["git", "show-ref", "--verify", "--quiet", f"refs/heads/{branch}"],
-            cwd=self.config.repo_path,
-            text=True,
-            capture_output=True,
-            check=False,
-        )
-        return proc.returncode == 0
+        return await self._git_reader.resolve(f"refs/heads/{branch}") is not None
 
-    def _run_shell(self, cmd: str, check: bool = True) -> str:
-        proc = subprocess.run(
+    async def _run_shell_async(self, cmd: str, check: bool = True) -> str:
+        proc = await asyncio.create_subprocess_shell(
             cmd,
             cwd=self.config.repo_path,
-            text=True,
-            capture_output=True,
-            check=False,
-            shell=True,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
             executable="/bin/bash",
         )
+        out, err = await proc.communicate()
+        stdout = out.decode("utf-8", errors="replace").strip()
         if check and proc.returncode != 0:
-            raise CodeOpsError(
-                f"Command failed ({cmd}): {proc.stderr.strip() or proc.stdout.strip()}"
-            )
-        return proc.stdout.strip()
+            stderr = err.decode("utf-8", errors="replace").strip()
+            raise CodeOpsError(f"Command failed ({cmd}): {stderr or stdout}")
+        return stdout
 
     def _iso_now(self) -> str:
         return datetime.now(timezone.utc).isoformat()
@@ -169,12 +295,17 @@ class CodeOps:
         if self.config.tasks_file.exists():
             return
         payload = {"next_id": 1, "tasks": []}
-        self.config.tasks_file.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        self._write_store_bytes(_json_dumps(payload))
+
+    def _write_store_bytes(self, data: bytes) -> None:
+        # Write a sibling temp file and rename over the store so readers never see a partial file.
+        tmp = self.config.tasks_file.with_name(self.config.tasks_file.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self.config.tasks_file)
 
     def _load_store(self) -> dict[str, Any]:
         try:
-            raw = self.config.tasks_file.read_text(encoding="utf-8")
-            payload = json.loads(raw)
+            payload = _json_loads(self.config.tasks_file.read_bytes())
         except Exception as exc:
             raise CodeOpsError(f"Failed reading task store: {exc}") from exc
 
@@ -186,51 +317,90 @@ class CodeOps:
             raise CodeOpsError("Task store invalid: tasks must be list.")
         return payload
 
-    def _save_store(self, payload: dict[str, Any]) -> None:
-        self.config.tasks_file.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    def _store_stamp(self) -> tuple[int, int, int] | None:
+        try:
+            st = self.config.tasks_file.stat()
+        except OSError:
+            return None
+        # The inode catches atomic replaces that keep size and land within mtime granularity.
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _store(self) -> dict[str, Any]:
+        """Return the parsed store, re-reading the file only if it changed since our last load/save."""
+        stamp = self._store_stamp()
+        if self._payload is None or stamp is None or stamp != self._payload_stamp:
+            payload = self._load_store()
+            self._task_index = {int(t.get("task_id", -1)): t for t in payload["tasks"]}
+            self._payload = payload
+            self._payload_stamp = stamp
+        return self._payload
+
+    def _save_store(self) -> None:
+        payload = self._payload
+        assert payload is not None, "_store() must be called before _save_store()"
+        payload["tasks"] = list(self._task_index.values())
+        try:
+            self._write_store_bytes(_json_dumps(payload))
+        except OSError:
+            # Don't keep serving in-memory state that never reached disk.
+            self._payload = None
+            raise
+        self._payload_stamp = self._store_stamp()
 
     def _tasks(self) -> list[CodeTask]:
-        payload = self._load_store()
-        return [CodeTask.from_dict(t) for t in payload.get("tasks", [])]
+        self._store()
+        return [CodeTask.from_dict(t) for t in self._task_index.values()]
 
     def _upsert_task(self, task: CodeTask) -> None:
-        payload = self._load_store()
-        tasks = payload.get("tasks", [])
-        replaced = False
-        for i, current in enumerate(tasks):
-            if int(current.get("task_id", -1)) == task.task_id:
-                tasks[i] = task.to_dict()
-                replaced = True
-                break
-        if not replaced:
-            tasks.append(task.to_dict())
-        payload["tasks"] = tasks
-        self._save_store(payload)
+        self._store()
+        # Existing ids keep their position in the file; new ones append, as before.
+        self._task_index[task.task_id] = task.to_dict()
+        self._save_store()
 
     def _next_id(self) -> int:
-        payload = self._load_store()
+        # Only bumps the in-memory counter; the caller's _upsert_task persists it with the new task.
+        payload = self._store()
         nxt = int(payload.get("next_id", 1))
         payload["next_id"] = nxt + 1
-        self._save_store(payload)
         return nxt
 
-    def _infer_files_from_text(self, text: str) -> list[str]:
-        candidates = re.findall(r"[A-Za-z0-9_./-]+\.(?:py|md|json|yaml|yml|toml|js|ts|html|css|gs)", text)
-        seen: set[str] = set()
-        out: list[str] = []
-        tracked = set(self._run(["git", "ls-files"], check=True).splitlines())
-        for item in candidates:
-            path = item.strip()
-            if path in tracked and path not in seen:
-                seen.add(path)
-                out.append(path)
-        return out
-
-    def _infer_files_for_task(self, task: CodeTask) -> list[str]:
+    async def _tracked_files(self) -> frozenset[str]:
+        # `git ls-files` lists the index, so the index file's stat is a cheap change detector.
+        try:
+            st = (self.config.repo_path / ".git" / "index").stat()
+            stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp is not None and self._tracked_cache is not None and self._tracked_cache[0] == stamp:
+            return self._tracked_cache[1]
+        tracked: frozenset[str] | None = None
+        if pygit2 is not None and stamp is not None:
+            # Read the index in-process; a standalone Index object is safe to use from a worker thread.
+            try:
+                tracked = await asyncio.to_thread(self._read_index_paths)
+            except (pygit2.GitError, OSError, ValueError):
+                # Index formats libgit2 rejects (e.g. split-index) fall through to the CLI.
+                tracked = None
+        if tracked is None:
+            tracked = frozenset((await self._run_async(["git", "ls-files"], check=True)).splitlines())
+        if stamp is not None:
+            self._tracked_cache = (stamp, tracked)
+        return tracked
+
+    def _read_index_paths(self) -> frozenset[str]:
+        index = pygit2.Index(str(self.config.repo_path / ".git" / "index"))
+        return frozenset(entry.path for entry in index)
+
+    async def _infer_files_from_text(self, text: str) -> list[str]:
+        tracked = await self._tracked_files()
+        # dict.fromkeys dedupes while keeping first-mention order.
+        return list(dict.fromkeys(m for m in _FILE_CANDIDATE_RE.findall(text) if m in tracked))
+
+    async def _infer_files_for_task(self, task: CodeTask) -> list[str]:
         if task.files:
             return task.files
 
-        files = self._infer_files_from_text(task.instructions + "\n" + task.plan)
+        files = await self._infer_files_from_text(task.instructions + "\n" + task.plan)
         if files:
             return files[: self.config.max_context_files]
 
@@ -241,16 +411,16 @@ class CodeOps:
             "README.md",
             "website/kiroku_outreach_automation.gs",
         ]
-        tracked = set(self._run(["git", "ls-files"], check=True).splitlines())
+        tracked = await self._tracked_files()
         return [f for f in defaults if f in tracked][: self.config.max_context_files]
 
     def _looks_like_unified_diff(self, text: str) -> bool:
         candidate = (text or "").strip()
         if not candidate:
             return False
-        if re.search(r"(?m)^diff --git\s", candidate):
+        if _DIFF_GIT_RE.search(candidate):
             return True
-        if re.search(r"(?m)^---\s", candidate) and re.search(r"(?m)^\+\+\+\s", candidate):
+        if _DIFF_MINUS_RE.search(candidate) and _DIFF_PLUS_RE.search(candidate):
             return True
         return False
 
@@ -259,18 +429,22 @@ class CodeOps:
         if not text:
             return ""
 
+        # Common case: the model returned a bare diff, so skip the fenced-block scan.
+        if text.startswith(("diff --git ", "--- a/", "--- /dev/null")):
+            return text + "\n"
+
         # Prefer extracting a fenced diff block if present.
-        fenced = re.findall(r"```(?:diff)?\s*\n(.*?)```", text, flags=re.S)
+        fenced = _FENCED_DIFF_RE.findall(text)
         for block in fenced:
             block = block.strip()
             if self._looks_like_unified_diff(block):
                 return block.strip() + "\n"
 
         # Otherwise, extract from the first diff marker.
-        m = re.search(r"(?m)^diff --git\s", text)
+        m = _DIFF_GIT_RE.search(text)
         if m:
             return text[m.start() :].strip() + "\n"
-        m = re.search(r"(?m)^---\sa/", text)
+        m = _DIFF_MINUS_A_RE.search(text)
         if m:
             return text[m.start() :].strip() + "\n"
 
@@ -288,34 +462,52 @@ class CodeOps:
         if not text.strip():
             return ""
 
-        lines = [ln for ln in text.splitlines() if not ln.startswith("index ")]
-        cleaned = "\n".join(lines).strip("\n")
+        cleaned = _DIFF_INDEX_LINE_RE.sub("", text).strip("\n")
         return cleaned + "\n" if cleaned else ""
 
     def _is_placeholder_task(self, task: CodeTask) -> bool:
-        def _is_placeholder(s: str) -> bool:
-            s = (s or "").strip()
-            return bool(re.fullmatch(r"<[^>]+>", s))
-
-        return _is_placeholder(task.title) or _is_placeholder(task.instructions) or "<instructions>" in task.instructions
-
-    def _remote_slug(self) -> str:
-        remote_url = self._run(["git", "remote", "get-url", self.config.remote_name], check=True)
-        remote_url = remote_url.strip()
+        return bool(
+            _PLACEHOLDER_RE.fullmatch((task.title or "").strip())
+            or _PLACEHOLDER_RE.fullmatch((task.instructions or "").strip())
+            or "<instructions>" in task.instructions
+        )
 
+    def _pygit2_remote_url(self) -> str | None:
+        try:
+            return pygit2.Repository(str(self.config.repo_path)).remotes[self.config.remote_name].url
+        except (KeyError, ValueError, pygit2.GitError):
+            return None
+
+    async def _remote_url(self) -> str:
+        if pygit2 is not None:
+            # Opening the repository reads config/refs from disk; keep it off the event loop.
+            url = await asyncio.to_thread(self._pygit2_remote_url)
+            if url:
+                return url
+        return await self._run_async(["git", "remote", "get-url", self.config.remote_name], check=True)
+
+    async def _remote_slug(self) -> str:
+        # The remote doesn't move while the bot is running; resolve it once.
+        if self._remote_slug_cache is None:
+            self._remote_slug_cache = self._parse_remote_slug((await self._remote_url()).strip())
+        return self._remote_slug_cache
+
+    def _parse_remote_slug(self, remote_url: str) -> str:
         # git@host:owner/repo.git
-        m_ssh = re.match(r"git@[^:]+:([^\s]+?)(?:\.git)?$", remote_url)
+        m_ssh = _SSH_REMOTE_RE.match(remote_url)
         if m_ssh:
             return m_ssh.group(1)
 
         # https://host/owner/repo(.git)
-        m_https = re.match(r"https?://[^/]+/([^\s]+?)(?:\.git)?$", remote_url)
+        m_https = _HTTPS_REMOTE_RE.match(remote_url)
         if m_https:
             return m_https.group(1)
 
         raise CodeOpsError(f"Could not parse remote URL: {remote_url}")
 
     async def create_task(self, title: str, instructions: str, requested_by: str, requested_by_id: str) -> CodeTask:
+        instructions = instructions.strip()
+        files = await self._infer_files_from_text(instructions)
         async with self._state_lock:
             task_id = self._next_id()
             now = self._iso_now()
@@ -323,15 +515,15 @@ class CodeOps:
             task = CodeTask(
                 task_id=task_id,
                 title=title.strip()[:120],
-                instructions=instructions.strip(),
+                instructions=instructions,
                 requested_by=requested_by,
                 requested_by_id=requested_by_id,
                 status=TASK_STATUS_NEW,
                 branch=branch,
                 created_at=now,
                 updated_at=now,
+                files=files,
             )
-            task.files = self._infer_files_from_text(task.instructions)
             self._upsert_task(task)
             return task
 
@@ -345,44 +537,41 @@ class CodeOps:
 
     async def get_task(self, task_id: int) -> CodeTask:
         async with self._state_lock:
-            for task in self._tasks():
-                if task.task_id == task_id:
-                    return task
-        raise CodeOpsError(f"Task {task_id} not found.")
+            return self._get_task_unlocked(task_id)
 
     async def plan_task(self, task_id: int) -> CodeTask:
-        async with self._state_lock:
-            task = self._get_task_unlocked(task_id)
+        async with self._task_lock(task_id):
+            task = await self._load_task(task_id)
             if self._is_placeholder_task(task):
                 raise CodeOpsError(
                     "Task looks like placeholders (`<title>` / `<instructions>`). "
                     "Create a new task with real instructions, e.g. "
                     "`!kiroku task Add ping command || Add a read command ping that replies pong.`"
                 )
-            files = self._infer_files_for_task(task)
+            files = await self._infer_files_for_task(task)
             task.files = files
 
             if self._llm_available():
-                task.plan = await self._llm_plan(task)
+                task.plan = await self._llm_plan(task, await self._build_context(files))
             else:
                 task.plan = self._fallback_plan(task, files)
 
             task.status = TASK_STATUS_PLANNED
             task.updated_at = self._iso_now()
             task.last_error = ""
-            self._upsert_task(task)
+            await self._save_task(task)
             return task
 
     async def patch_task(self, task_id: int) -> CodeTask:
-        async with self._state_lock:
-            task = self._get_task_unlocked(task_id)
+        async with self._task_lock(task_id):
+            task = await self._load_task(task_id)
             if self._is_placeholder_task(task):
                 raise CodeOpsError(
                     "Task looks like placeholders (`<title>` / `<instructions>`). "
                     "Create a new task with real instructions, then run diff/run again."
                 )
+            files = await self._infer_files_for_task(task)
             if not task.plan:
-                files = self._infer_files_for_task(task)
                 task.plan = self._fallback_plan(task, files)
                 task.files = files
 
@@ -391,12 +580,15 @@ class CodeOps:
                     "No LLM provider configured. Set ANTHROPIC_API_KEY or OPENAI_API_KEY in .env to enable patch generation."
                 )
 
-            raw1 = await self._llm_patch(task, strict=False)
+            # Both attempts share the same file context; read it once.
+            context = await self._build_context(files)
+            # The first attempt may be cut short if it opens with prose; the strict retry runs in full.
+            raw1 = await self._llm_patch(task, context, strict=False)
             candidate = self._sanitize_diff_text(self._extract_unified_diff(raw1))
 
             if not self._looks_like_unified_diff(candidate):
                 # Retry once with a stricter prompt if the model responded with prose.
-                raw2 = await self._llm_patch(task, strict=True)
+                raw2 = await self._llm_patch(task, context, strict=True)
                 candidate2 = self._sanitize_diff_text(self._extract_unified_diff(raw2))
                 if self._looks_like_unified_diff(candidate2):
                     candidate = candidate2
@@ -413,70 +605,84 @@ class CodeOps:
             task.status = TASK_STATUS_PATCHED
             task.updated_at = self._iso_now()
             task.last_error = ""
-            self._upsert_task(task)
+            await self._save_task(task)
             return task
 
     def _llm_available(self) -> bool:
         return bool(self.config.anthropic_api_key or self.config.openai_api_key)
 
     async def apply_task(self, task_id: int) -> CodeTask:
-        async with self._state_lock:
-            task = self._get_task_unlocked(task_id)
+        async with self._task_lock(task_id):
+            task = await self._load_task(task_id)
             if not task.patch.strip():
                 raise CodeOpsError("Task has no patch. Run patch step first.")
 
-            self._prepare_branch(task.branch)
-            self._apply_patch_text(task.patch)
+            async with self._worktree_lock:
+                # The lock is released between apply and commit, so the tree may still hold another
+                # task's staged patch; checking out over it would carry that patch onto this branch.
+                dirty = await self._run_async(["git", "status", "--porcelain", "--untracked-files=no"], check=True)
+                if dirty:
+                    raise CodeOpsError(
+                        "Working tree has uncommitted changes (another task applied but not committed?). "
+                        "Commit or reset them before applying."
+                    )
+                await self._prepare_branch(task.branch)
+                await self._apply_patch_text(task.patch)
 
-            if self.config.verify_command:
-                self._run_shell(self.config.verify_command, check=True)
+                if self.config.verify_command:
+                    await self._run_shell_async(self.config.verify_command, check=True)
 
             task.status = TASK_STATUS_APPLIED
             task.updated_at = self._iso_now()
             task.last_error = ""
-            self._upsert_task(task)
+            await self._save_task(task)
             return task
 
     async def commit_task(self, task_id: int, message: str | None = None) -> CodeTask:
-        async with self._state_lock:
-            task = self._get_task_unlocked(task_id)
-            if not self._branch_exists(task.branch):
+        async with self._task_lock(task_id):
+            task = await self._load_task(task_id)
+            if not await self._branch_exists(task.branch):
                 raise CodeOpsError(
                     f"Task branch does not exist yet: {task.branch}. "
                     "Run `apply` first to create the branch and apply the patch "
                     "(or run `run` for the full pipeline)."
                 )
-            self._run(["git", "checkout", task.branch], check=True)
-            self._run(["git", "add", "-A"], check=True)
+            async with self._worktree_lock:
+                await self._run_async(["git", "checkout", task.branch], check=True)
+                await self._run_async(["git", "add", "-A"], check=True)
 
-            has_changes = self._run(["git", "diff", "--cached", "--name-only"], check=True)
-            if not has_changes.strip():
-                raise CodeOpsError("No staged changes to commit.")
+                has_changes = await self._run_async(["git", "diff", "--cached", "--name-only"], check=True)
+                if not has_changes.strip():
+                    raise CodeOpsError("No staged changes to commit.")
 
-            commit_msg = message.strip() if message else f"task({task.task_id}): {task.title}"
-            self._run(["git", "commit", "-m", commit_msg], check=True)
-            sha = self._run(["git", "rev-parse", "HEAD"], check=True)
+                commit_msg = message.strip() if message else f"task({task.task_id}): {task.title}"
+                await self._run_async(["git", "commit", "-m", commit_msg], check=True)
+                self._tracked_cache = None
+                sha = await self._git_reader.resolve("HEAD")
+            if not sha:
+                raise CodeOpsError("Could not resolve HEAD after commit.")
 
             task.commit_sha = sha
             task.status = TASK_STATUS_COMMITTED
             task.updated_at = self._iso_now()
             task.last_error = ""
-            self._upsert_task(task)
+            await self._save_task(task)
             return task
 
     async def publish_task(self, task_id: int) -> CodeTask:
-        async with self._state_lock:
-            task = self._get_task_unlocked(task_id)
-            if not self._branch_exists(task.branch):
+        async with self._task_lock(task_id):
+            task = await self._load_task(task_id)
+            if not await self._branch_exists(task.branch):
                 raise CodeOpsError(
                     f"Task branch does not exist yet: {task.branch}. "
                     "Run `apply` first to create the branch and apply the patch "
                     "(or run `run` for the full pipeline)."
                 )
-            self._run(["git", "checkout", task.branch], check=True)
-            self._run(["git", "push", "-u", self.config.remote_name, task.branch], check=True)
+            async with self._worktree_lock:
+                await self._run_async(["git", "checkout", task.branch], check=True)
+                await self._run_async(["git", "push", "-u", self.config.remote_name, task.branch], check=True)
 
-            slug = self._remote_slug()
+            slug = await self._remote_slug()
             task.compare_url = (
                 f"https://github.com/{slug}/compare/"
                 f"{self.config.base_branch}...{task.branch}?expand=1"
@@ -484,13 +690,13 @@ class CodeOps:
             task.status = TASK_STATUS_PUBLISHED
             task.updated_at = self._iso_now()
             task.last_error = ""
-            self._upsert_task(task)
+            await self._save_task(task)
             return task
 
     async def merge_task(self, task_id: int) -> CodeTask:
-        async with self._state_lock:
-            task = self._get_task_unlocked(task_id)
-            if not self._branch_exists(task.branch):
+        async with self._task_lock(task_id):
+            task = await self._load_task(task_id)
+            if not await self._branch_exists(task.branch):
                 raise CodeOpsError(
                     f"Task branch does not exist yet: {task.branch}. "
                     "Run `apply` first to create the branch and apply the patch "
@@ -498,57 +704,74 @@ class CodeOps:
                 )
 
             # Ensure base branch is up to date, then merge.
-            self._run(["git", "fetch", self.config.remote_name], check=True)
-            self._run(["git", "checkout", self.config.base_branch], check=True)
-            self._run(
-                ["git", "pull", "--ff-only", self.config.remote_name, self.config.base_branch],
-                check=True,
-            )
+            async with self._worktree_lock:
+                await self._run_async(["git", "fetch", self.config.remote_name], check=True)
+                await self._run_async(["git", "checkout", self.config.base_branch], check=True)
+                await self._run_async(
+                    ["git", "pull", "--ff-only", self.config.remote_name, self.config.base_branch],
+                    check=True,
+                )
 
-            message = f"merge: task #{task.task_id}"
-            self._run(["git", "merge", "--no-ff", "-m", message, task.branch], check=True)
-            self._run(["git", "push", self.config.remote_name, self.config.base_branch], check=True)
+                message = f"merge: task #{task.task_id}"
+                await self._run_async(["git", "merge", "--no-ff", "-m", message, task.branch], check=True)
+                await self._run_async(["git", "push", self.config.remote_name, self.config.base_branch], check=True)
 
             task.status = TASK_STATUS_MERGED
             task.updated_at = self._iso_now()
             task.last_error = ""
-            self._upsert_task(task)
+            await self._save_task(task)
             return task
 
     async def fail_task(self, task_id: int, error: str) -> None:
+        # Called from the bot's error path; keep the store read/write off the event loop.
+        async with self._task_lock(task_id), self._state_lock:
+            await asyncio.to_thread(self._fail_task_unlocked, task_id, error)
+
+    def _fail_task_unlocked(self, task_id: int, error: str) -> None:
+        task = self._get_task_unlocked(task_id)
+        task.status = TASK_STATUS_FAILED
+        task.last_error = error[:2000]
+        task.updated_at = self._iso_now()
+        self._upsert_task(task)
+
+    def _get_task_unlocked(self, task_id: int) -> CodeTask:
+        self._store()
+        data = self._task_index.get(task_id)
+        if data is None:
+            raise CodeOpsError(f"Task {task_id} not found.")
+        # Hand out a fresh object so callers' edits only land via _upsert_task.
+        return CodeTask.from_dict(data)
+
+    def _task_lock(self, task_id: int) -> asyncio.Lock:
+        lock = self._task_locks.get(task_id)
+        if lock is None:
+            lock = self._task_locks[task_id] = asyncio.Lock()
+        return lock
+
+    async def _load_task(self, task_id: int) -> CodeTask:
+        async with self._state_lock:
+            return self._get_task_unlocked(task_id)
+
+    async def _save_task(self, task: CodeTask) -> None:
         async with self._state_lock:
-            task = self._get_task_unlocked(task_id)
-            task.status = TASK_STATUS_FAILED
-            task.last_error = error[:2000]
-            task.updated_at = self._iso_now()
             self._upsert_task(task)
 
-    def _get_task_unlocked(self, task_id: int) -> CodeTask:
-        for task in self._tasks():
-            if task.task_id == task_id:
-                return task
-        raise CodeOpsError(f"Task {task_id} not found.")
-
-    def _prepare_branch(self, branch: str) -> None:
-        self._run(["git", "fetch", self.config.remote_name], check=True)
-        self._run(["git", "checkout", self.config.base_branch], check=True)
-        self._run(["git", "pull", "--ff-only", self.config.remote_name, self.config.base_branch], check=True)
-        self._run(["git", "checkout", "-B", branch], check=True)
-
-    def _apply_patch_text(self, patch_text: str) -> None:
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".patch", delete=False, encoding="utf-8") as tmp:
-            tmp.write(patch_text)
-            patch_path = tmp.name
+    async def _prepare_branch(self, branch: str) -> None:
+        await self._run_async(["git", "fetch", self.config.remote_name], check=True)
+        await self._run_async(["git", "checkout", self.config.base_branch], check=True)
+        await self._run_async(["git", "pull", "--ff-only", self.config.remote_name, self.config.base_branch], check=True)
+        await self._run_async(["git", "checkout", "-B", branch], check=True)
 
+    async def _apply_patch_text(self, patch_text: str) -> None:
+        # Feed the patch on stdin rather than round-tripping it through a temp file.
         try:
-            self._run(["git", "apply", "--index", "--whitespace=fix", patch_path], check=True)
+            await self._run_async(
+                ["git", "apply", "--index", "--whitespace=fix", "-"],
+                check=True,
+                input=patch_text.encode("utf-8"),
+            )
         except CodeOpsError as exc:
             raise CodeOpsError(f"Patch apply failed: {exc}") from exc
-        finally:
-            try:
-                os.remove(patch_path)
-            except OSError:
-                pass
 
     def _fallback_plan(self, task: CodeTask, files: list[str]) -> str:
         file_lines = "\n".join(f"- {p}" for p in files) if files else "- determine impacted files"
@@ -562,24 +785,29 @@ class CodeOps:
             f"{file_lines}"
         )
 
-    def _build_context(self, files: list[str]) -> str:
-        chunks: list[str] = []
-        for path_str in files[: self.config.max_context_files]:
-            path = (self.config.repo_path / path_str).resolve()
-            if not path.exists() or not path.is_file():
-                continue
-            try:
-                content = path.read_text(encoding="utf-8", errors="ignore")
-            except Exception:
-                continue
-            content = content[: self.config.max_context_chars_per_file]
-            chunks.append(f"FILE: {path_str}\n{content}\n")
-        return "\n".join(chunks)
-
-    async def _llm_plan(self, task: CodeTask) -> str:
-        files = self._infer_files_for_task(task)
-        context = self._build_context(files)
+    def _read_context_file(self, path_str: str) -> str | None:
+        path = (self.config.repo_path / path_str).resolve()
+        if not path.exists() or not path.is_file():
+            return None
+        limit = self.config.max_context_chars_per_file
+        try:
+            # UTF-8 is at most 4 bytes per char, so this prefix always covers `limit` chars.
+            with path.open("rb") as fh:
+                raw = fh.read(limit * 4)
+        except Exception:
+            return None
+        # Binary reads skip universal newlines; normalize so CRLF files don't leak `\r` into the prompt.
+        content = raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")[:limit]
+        return f"FILE: {path_str}\n{content}\n"
+
+    async def _build_context(self, files: list[str]) -> str:
+        # Read the context files concurrently off the event loop; gather keeps them in order.
+        chunks = await asyncio.gather(
+            *(asyncio.to_thread(self._read_context_file, p) for p in files[: self.config.max_context_files])
+        )
+        return "\n".join(c for c in chunks if c is not None)
 
+    async def _llm_plan(self, task: CodeTask, context: str) -> str:
         system = (
             "You are a senior software engineer. Build an execution plan for a coding task. "
             "Respond with concise steps and a short list of target files."
@@ -592,12 +820,9 @@ class CodeOps:
             "Plan:\n- ...\n"
             "Files:\n- path"
         )
-        return await self._chat_completion(system, user)
-
-    async def _llm_patch(self, task: CodeTask, strict: bool) -> str:
-        files = self._infer_files_for_task(task)
-        context = self._build_context(files)
+        return await self._chat_completion(system, user, max_tokens=_PLAN_MAX_TOKENS)
 
+    async def _llm_patch(self, task: CodeTask, context: str, strict: bool) -> str:
         system = (
             "You are an expert software engineer. "
             "Return ONLY a valid unified diff patch against the repository root. "
@@ -621,12 +846,36 @@ class CodeOps:
             "- Preserve existing style and behavior unless task requests otherwise.\n"
             "- Return a single unified diff."
         )
-        return await self._chat_completion(system, user)
+        return await self._chat_completion(
+            system, user, max_tokens=_PATCH_MAX_TOKENS, abort_on_prose=not strict
+        )
 
-    async def _chat_completion(self, system: str, user: str) -> str:
+    async def _session(self) -> aiohttp.ClientSession:
+        # One pooled session for all LLM calls so plan/patch/retry reuse the same TLS connection.
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=180),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        """Release the HTTP session and the git cat-file helper."""
+        http, self._http = self._http, None
+        if http is not None:
+            await http.close()
+        await self._git_reader.aclose()
+
+    async def _chat_completion(
+        self,
+        system: str,
+        user: str,
+        max_tokens: int = _PATCH_MAX_TOKENS,
+        abort_on_prose: bool = False,
+    ) -> str:
         # Prefer Anthropic when available (OpenAI key may be out of quota).
         if self.config.anthropic_api_key:
-            return await self._anthropic_messages(system, user)
+            return await self._anthropic_messages(system, user, max_tokens, abort_on_prose)
         if self.config.openai_api_key:
             return await self._openai_chat_completion(system, user)
         raise CodeOpsError("No LLM provider configured (set ANTHROPIC_API_KEY or OPENAI_API_KEY).")
@@ -646,53 +895,93 @@ class CodeOps:
             "Content-Type": "application/json",
         }
 
-        timeout = aiohttp.ClientTimeout(total=180)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                text = await response.text()
-                if response.status >= 300:
-                    raise CodeOpsError(f"Model request failed ({response.status}): {text[:800]}")
-                try:
-                    data = json.loads(text)
-                    return data["choices"][0]["message"]["content"].strip()
-                except Exception as exc:
-                    raise CodeOpsError(f"Invalid model response: {text[:500]}") from exc
-
-    async def _anthropic_messages(self, system: str, user: str) -> str:
+        session = await self._session()
+        async with session.post(url, headers=headers, json=payload) as response:
+            raw = await response.read()
+            if response.status >= 300:
+                text = raw.decode("utf-8", errors="replace")
+                raise CodeOpsError(f"Model request failed ({response.status}): {text[:800]}")
+            try:
+                data = _json_loads(raw)
+                return data["choices"][0]["message"]["content"].strip()
+            except Exception as exc:
+                text = raw.decode("utf-8", errors="replace")
+                raise CodeOpsError(f"Invalid model response: {text[:500]}") from exc
+
+    async def _anthropic_messages(
+        self, system: str, user: str, max_tokens: int, abort_on_prose: bool = False
+    ) -> str:
         url = f"{self.config.anthropic_base_url.rstrip('/')}/v1/messages"
         payload = {
             "model": self.config.anthropic_model,
-            "max_tokens": 4000,
+            "max_tokens": max_tokens,
             "temperature": 0.2,
             "system": system,
             "messages": [{"role": "user", "content": user}],
         }
+        if abort_on_prose:
+            payload["stream"] = True
         headers = {
             "x-api-key": str(self.config.anthropic_api_key),
             "anthropic-version": self.config.anthropic_version,
             "content-type": "application/json",
         }
 
-        timeout = aiohttp.ClientTimeout(total=180)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                text = await response.text()
-                if response.status >= 300:
-                    raise CodeOpsError(f"Model request failed ({response.status}): {text[:800]}")
-                try:
-                    data = json.loads(text)
-                    parts = data.get("content", [])
-                    out = "".join(str(p.get("text", "")) for p in parts if p.get("type") == "text")
-                    return out.strip()
-                except Exception as exc:
-                    raise CodeOpsError(f"Invalid model response: {text[:500]}") from exc
-
-
+        session = await self._session()
+        async with session.post(url, headers=headers, json=payload) as response:
+            if abort_on_prose and response.status < 300:
+                return await self._read_anthropic_stream(response)
+            raw = await response.read()
+            if response.status >= 300:
+                text = raw.decode("utf-8", errors="replace")
+                raise CodeOpsError(f"Model request failed ({response.status}): {text[:800]}")
+            try:
+                data = _json_loads(raw)
+                parts = data.get("content", [])
+                out = "".join(str(p.get("text", "")) for p in parts if p.get("type") == "text")
+                return out.strip()
+            except Exception as exc:
+                text = raw.decode("utf-8", errors="replace")
+                raise CodeOpsError(f"Invalid model response: {text[:500]}") from exc
+
+    async def _read_anthropic_stream(self, response: aiohttp.ClientResponse) -> str:
+        # Collect text deltas from the SSE stream. If the opening text has no diff or fence in
+        # sight, drop the connection and return what we have so the caller retries right away.
+        parts: list[str] = []
+        size = 0
+        sniffed = False
+        async for line in response.content:
+            if not line.startswith(b"data:"):
+                continue
+            try:
+                event = _json_loads(line[5:])
+            except Exception:
+                continue
+            kind = event.get("type")
+            if kind == "error":
+                raise CodeOpsError(f"Model request failed: {event.get('error')}")
+            if kind != "content_block_delta":
+                continue
+            text = event.get("delta", {}).get("text")
+            if not text:
+                continue
+            parts.append(text)
+            size += len(text)
+            if not sniffed and size >= _PATCH_SNIFF_CHARS:
+                sniffed = True
+                head = "".join(parts)
+                if not _DIFF_START_RE.search(head):
+                    response.close()
+                    return head.strip()
+        return "".join(parts).strip()
+
+
+@functools.lru_cache(maxsize=256)
 def parse_task_id(value: str) -> int:
     cleaned = str(value or "").strip()
     # Accept common Discord-friendly formats like "1", "#1", or "#1)".
     # Disallow sticking additional word characters right after the ID (e.g. "1abc").
-    m = re.match(r"^#?([0-9]+)(?=$|[^0-9A-Za-z_])", cleaned)
+    m = _TASK_ID_RE.match(cleaned)
     if not m:
         raise CodeOpsError("Task ID must be a number (example: `1` or `#1`).")
     return int(m.group(1))
@@ -715,7 +1004,7 @@ def parse_title_and_instructions(raw: str) -> tuple[str, str]:
         raise CodeOpsError("Task title cannot be empty.")
     if not instructions:
         raise CodeOpsError("Task instructions cannot be empty.")
-    if re.fullmatch(r"<[^>]+>", title.strip()) or re.fullmatch(r"<[^>]+>", instructions.strip()):
+    if _PLACEHOLDER_RE.fullmatch(title.strip()) or _PLACEHOLDER_RE.fullmatch(instructions.strip()):
         raise CodeOpsError(
             "It looks like you pasted placeholders (`<title>` / `<instructions>`). "
             "Replace them with real text, e.g. "
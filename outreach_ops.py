@@ -1,45 +1,123 @@
 from __future__ import annotations
 
+import asyncio
 import csv
+import json
+import random
 import re
 import smtplib
 import ssl
+import string
+import threading
+import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from email.message import EmailMessage
 from pathlib import Path
-from typing import Iterable
-from urllib.parse import urljoin, urlparse
+from typing import Any, Iterable
+from urllib.parse import urljoin
 
 import aiohttp
 
+try:
+    import orjson
+except ImportError:  # optional: stdlib json fallback
+    orjson = None
+
+_DASHES_RE = re.compile(r"-{2,}")
+_TITLE_TAIL_RE = re.compile(r"\s+[-|:]\s+.*$")
+# Basic email regex. We keep it conservative to avoid false positives.
+_EMAIL_RE = re.compile(r"(?i)\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b")
+_HREF_RE = re.compile(r'href=["\']([^"\']*(?:partner|sponsor|contact|inquiry|sales)[^"\']*)["\']', re.I)
+_PARTNER_HREF_KEYS = ("partner", "sponsor")
+_CONTACT_HREF_KEYS = ("contact", "inquiry", "sales")
+_HOUSING_TEMPLATE_RE = re.compile(r"(?ms)^## Template D: Housing Partner.*?^Subject:\s*(.*?)\n\n(.*?)(?=^##\s)")
+# A `{{ var }}` placeholder, or a lone brace that must be escaped for str.format.
+_TEMPLATE_TOKEN_RE = re.compile(r"\{\{\s*([a-zA-Z0-9_]+)\s*\}\}|[{}]")
+_EMAIL_PRIORITY = ("partnership", "partner", "bizdev", "business", "bd", "alliances", "sales", "info")
+
+# Result pages fetched at once per search; kept small to stay under provider rate limits.
+_SEARCH_PAGE_CONCURRENCY = 4
+_SEARCH_MAX_ATTEMPTS = 5
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=25)
+_TEXT_CONTENT_TYPES = ("text/", "application/xhtml")
+# Many SMTP servers cap messages per session; start a fresh session after this many sends.
+_SMTP_MESSAGES_PER_SESSION = 20
+
 
 class OutreachOpsError(RuntimeError):
     pass
 
 
+def _json_loads(raw: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def _iso_now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    # Second precision is plenty for sent_at and skips microsecond formatting.
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _file_stamp() -> str:
+    # Local-time stamp for output filenames; time.strftime avoids building a datetime.
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+class _BlankDefaults(dict):
+    # Unknown template variables render as empty strings.
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def _template_token(m: re.Match[str]) -> str:
+    name = m.group(1)
+    if name is None:
+        return m.group(0) * 2
+    # Only identifiers can be format_map keys; `{0}` would be a positional field and raise.
+    # Nothing else can be among the values, so it renders empty as it always has.
+    return "{" + name + "}" if name.isidentifier() else ""
+
+
+def _to_format_template(text: str) -> str:
+    # `{{ var }}` -> `{var}`; any other brace is doubled so format_map leaves it literal.
+    return _TEMPLATE_TOKEN_RE.sub(_template_token, text)
+
+
+class _SafeFilenameTable(dict):
+    # str.translate table: kept characters map to themselves, everything else (incl. non-ASCII) to "-".
+    def __missing__(self, code: int) -> str:
+        return "-"
+
+
+_SAFE_FILENAME_TABLE = _SafeFilenameTable((ord(c), c) for c in string.ascii_letters + string.digits + "._-")
 
 
 def _safe_filename(s: str) -> str:
-    s = re.sub(r"[^A-Za-z0-9._-]+", "-", s.strip())
-    return re.sub(r"-{2,}", "-", s).strip("-") or "file"
+    s = s.strip().translate(_SAFE_FILENAME_TABLE)
+    return _DASHES_RE.sub("-", s).strip("-") or "file"
 
 
 def _normalize_domain(url: str) -> str:
-    parsed = urlparse((url or "").strip())
-    host = (parsed.netloc or parsed.path or "").strip().lower()
-    host = host.split("@")[-1]
-    host = host.split(":")[0]
-    host = host[4:] if host.startswith("www.") else host
-    return host
+    # Plain string slicing instead of urlparse; only the host is needed.
+    host = (url or "").strip().lower()
+    _, sep, rest = host.partition("://")
+    if sep:
+        host = rest
+    host = host.lstrip("/")
+    for delim in "/?#":
+        host = host.partition(delim)[0]
+    host = host.rpartition("@")[2]
+    host = host.partition(":")[0].strip()
+    return host[4:] if host.startswith("www.") else host
 
 
 def _pick_company_name(title: str, domain: str) -> str:
     t = (title or "").strip()
     if t:
-        t = re.sub(r"\s+[-|:]\s+.*$", "", t).strip()
+        t = _TITLE_TAIL_RE.sub("", t).strip()
         if 2 <= len(t) <= 80:
             return t
     if domain:
@@ -53,50 +131,56 @@ def _pick_company_name(title: str, domain: str) -> str:
 def _extract_emails(text: str) -> list[str]:
     if not text:
         return []
-    # Basic email regex. We keep it conservative to avoid false positives.
-    matches = re.findall(r"(?i)\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b", text)
-    seen: set[str] = set()
-    out: list[str] = []
-    for m in matches:
-        email = m.strip().lower()
-        if email in seen:
-            continue
+    # dict keeps first-seen order while deduping.
+    seen: dict[str, None] = {}
+    for m in _EMAIL_RE.finditer(text):
+        email = m.group(0).lower()
         # Exclude obvious placeholders.
-        if email.endswith("@example.com"):
-            continue
-        seen.add(email)
-        out.append(email)
-    return out
+        if not email.endswith("@example.com"):
+            seen[email] = None
+    return list(seen)
 
 
 def _find_contact_url(html: str, base_url: str) -> str:
     if not html:
         return ""
-    # Prioritize partnership/sponsor pages, then contact/inquiry.
-    patterns = [
-        r'href=["\']([^"\']*(?:partner|sponsor|partnership)[^"\']*)["\']',
-        r'href=["\']([^"\']*(?:contact|inquiry|sales)[^"\']*)["\']',
-    ]
-    for pat in patterns:
-        m = re.search(pat, html, flags=re.I)
-        if not m:
-            continue
-        href = (m.group(1) or "").strip()
-        if not href or href.startswith("javascript:") or href.startswith("#"):
-            continue
-        return urljoin(base_url, href)
+    # Prioritize partnership/sponsor pages, then contact/inquiry. One scan finds the first
+    # href of each kind; a usable partner link ends it early.
+    partner: str | None = None
+    contact: str | None = None
+    for m in _HREF_RE.finditer(html):
+        href = m.group(1)
+        lower = href.lower()
+        if partner is None and any(k in lower for k in _PARTNER_HREF_KEYS):
+            partner = href.strip()
+            if _usable_href(partner):
+                return urljoin(base_url, partner)
+        if contact is None and any(k in lower for k in _CONTACT_HREF_KEYS):
+            contact = href.strip()
+        if partner is not None and contact is not None:
+            break
+    if contact is not None and _usable_href(contact):
+        return urljoin(base_url, contact)
     return ""
 
 
+def _usable_href(href: str) -> bool:
+    return bool(href) and not href.startswith("javascript:") and not href.startswith("#")
+
+
 def _pick_best_email(emails: list[str]) -> str:
     if not emails:
         return ""
-    priority = ["partnership", "partner", "bizdev", "business", "bd", "alliances", "sales", "info"]
-    for key in priority:
-        for e in emails:
+    # Single pass: only keys ranked above the current best are worth checking.
+    best, best_rank = emails[0], len(_EMAIL_PRIORITY)
+    for e in emails:
+        for rank, key in enumerate(_EMAIL_PRIORITY[:best_rank]):
             if key in e:
-                return e
-    return emails[0]
+                best, best_rank = e, rank
+                break
+        if best_rank == 0:
+            break
+    return best
 
 
 @dataclass
@@ -107,10 +191,38 @@ class SearchResult:
 
 
 class SearchClient:
-    async def search(self, query: str, limit: int) -> list[SearchResult]:
+    async def search(self, session: aiohttp.ClientSession, query: str, limit: int) -> list[SearchResult]:
         raise NotImplementedError
 
 
+async def _get_with_retry(
+    session: aiohttp.ClientSession, url: str, *, params: dict[str, Any], headers: dict[str, str] | None = None
+) -> tuple[int, bytes]:
+    # Rate limits and transient 5xx are retried with exponential backoff + jitter (honoring
+    # Retry-After) so one throttled page doesn't fail the whole lead run.
+    attempt = 0
+    while True:
+        async with session.get(url, params=params, headers=headers) as resp:
+            raw = await resp.read()
+            status = resp.status
+            retry_after = resp.headers.get("Retry-After", "")
+        attempt += 1
+        if status not in _RETRY_STATUSES or attempt >= _SEARCH_MAX_ATTEMPTS:
+            return status, raw
+        delay = float(retry_after) if retry_after.isdigit() else 2 ** (attempt - 1) + random.random()
+        await asyncio.sleep(min(60.0, delay))
+
+
+def _flatten_pages(pages: list[list[SearchResult]], limit: int) -> list[SearchResult]:
+    # Pages arrive in offset order; the first empty page means the provider ran out of results.
+    out: list[SearchResult] = []
+    for page in pages:
+        if not page:
+            break
+        out.extend(page)
+    return out[:limit]
+
+
 class SerpApiSearchClient(SearchClient):
     def __init__(self, api_key: str, *, engine: str = "google", gl: str = "us", hl: str = "en") -> None:
         self.api_key = api_key
@@ -118,41 +230,41 @@ class SerpApiSearchClient(SearchClient):
         self.gl = gl
         self.hl = hl
 
-    async def search(self, query: str, limit: int) -> list[SearchResult]:
+    async def _page(
+        self, session: aiohttp.ClientSession, sem: asyncio.Semaphore, query: str, start: int, num: int
+    ) -> list[SearchResult]:
         url = "https://serpapi.com/search.json"
-        out: list[SearchResult] = []
-        start = 0
-        timeout = aiohttp.ClientTimeout(total=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            while len(out) < limit:
-                batch = min(20, limit - len(out))
-                params = {
-                    "engine": self.engine,
-                    "q": query,
-                    "api_key": self.api_key,
-                    "num": batch,
-                    "start": start,
-                    "gl": self.gl,
-                    "hl": self.hl,
-                }
-                async with session.get(url, params=params) as resp:
-                    txt = await resp.text()
-                    if resp.status >= 300:
-                        raise OutreachOpsError(f"SerpAPI request failed ({resp.status}): {txt[:400]}")
-                    data = await resp.json()
-                organic = data.get("organic_results") or []
-                if not organic:
-                    break
-                for item in organic:
-                    out.append(
-                        SearchResult(
-                            title=str(item.get("title", "")),
-                            link=str(item.get("link", "")),
-                            snippet=str(item.get("snippet", "")),
-                        )
-                    )
-                start += batch
-        return out[:limit]
+        params = {
+            "engine": self.engine,
+            "q": query,
+            "api_key": self.api_key,
+            "num": num,
+            "start": start,
+            "gl": self.gl,
+            "hl": self.hl,
+        }
+        async with sem:
+            status, raw = await _get_with_retry(session, url, params=params)
+        if status >= 300:
+            txt = raw[:400].decode("utf-8", errors="ignore")
+            raise OutreachOpsError(f"SerpAPI request failed ({status}): {txt}")
+        data = _json_loads(raw)
+        return [
+            SearchResult(
+                title=str(item.get("title", "")),
+                link=str(item.get("link", "")),
+                snippet=str(item.get("snippet", "")),
+            )
+            for item in data.get("organic_results") or []
+        ]
+
+    async def search(self, session: aiohttp.ClientSession, query: str, limit: int) -> list[SearchResult]:
+        batch = 20
+        sem = asyncio.Semaphore(_SEARCH_PAGE_CONCURRENCY)
+        pages = await asyncio.gather(
+            *(self._page(session, sem, query, start, min(batch, limit - start)) for start in range(0, limit, batch))
+        )
+        return _flatten_pages(pages, limit)
 
 
 class BingWebSearchClient(SearchClient):
@@ -161,33 +273,33 @@ class BingWebSearchClient(SearchClient):
         self.endpoint = endpoint
         self.mkt = mkt
 
-    async def search(self, query: str, limit: int) -> list[SearchResult]:
-        out: list[SearchResult] = []
-        offset = 0
-        timeout = aiohttp.ClientTimeout(total=60)
+    async def _page(
+        self, session: aiohttp.ClientSession, sem: asyncio.Semaphore, query: str, offset: int, count: int
+    ) -> list[SearchResult]:
         headers = {"Ocp-Apim-Subscription-Key": self.api_key}
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            while len(out) < limit:
-                batch = min(50, limit - len(out))
-                params = {"q": query, "count": batch, "offset": offset, "mkt": self.mkt, "responseFilter": "WebPages"}
-                async with session.get(self.endpoint, params=params, headers=headers) as resp:
-                    txt = await resp.text()
-                    if resp.status >= 300:
-                        raise OutreachOpsError(f"Bing search request failed ({resp.status}): {txt[:400]}")
-                    data = await resp.json()
-                pages = ((data.get("webPages") or {}).get("value")) or []
-                if not pages:
-                    break
-                for item in pages:
-                    out.append(
-                        SearchResult(
-                            title=str(item.get("name", "")),
-                            link=str(item.get("url", "")),
-                            snippet=str(item.get("snippet", "")),
-                        )
-                    )
-                offset += batch
-        return out[:limit]
+        params = {"q": query, "count": count, "offset": offset, "mkt": self.mkt, "responseFilter": "WebPages"}
+        async with sem:
+            status, raw = await _get_with_retry(session, self.endpoint, params=params, headers=headers)
+        if status >= 300:
+            txt = raw[:400].decode("utf-8", errors="ignore")
+            raise OutreachOpsError(f"Bing search request failed ({status}): {txt}")
+        data = _json_loads(raw)
+        return [
+            SearchResult(
+                title=str(item.get("name", "")),
+                link=str(item.get("url", "")),
+                snippet=str(item.get("snippet", "")),
+            )
+            for item in ((data.get("webPages") or {}).get("value")) or []
+        ]
+
+    async def search(self, session: aiohttp.ClientSession, query: str, limit: int) -> list[SearchResult]:
+        batch = 50
+        sem = asyncio.Semaphore(_SEARCH_PAGE_CONCURRENCY)
+        pages = await asyncio.gather(
+            *(self._page(session, sem, query, offset, min(batch, limit - offset)) for offset in range(0, limit, batch))
+        )
+        return _flatten_pages(pages, limit)
 
 
 @dataclass
@@ -277,6 +389,12 @@ class OutreachOps:
     def __init__(self, config: OutreachOpsConfig) -> None:
         self.config = config
         self.config.state_dir.mkdir(parents=True, exist_ok=True)
+        self._http: aiohttp.ClientSession | None = None
+        # (mtime_ns, size) of the template pack -> (subject, body) format strings.
+        self._template_cache: tuple[tuple[int, int], tuple[str, str]] | None = None
+        # Per-outbox locks: send/approve run in worker threads and each rewrites the whole CSV.
+        self._outbox_locks: dict[Path, threading.Lock] = {}
+        self._outbox_locks_guard = threading.Lock()
 
     def config_summary(self) -> str:
         search_ok = False
@@ -344,41 +462,69 @@ class OutreachOps:
                 "Fill these in `.env` and restart the bot."
             )
 
+    async def _session(self) -> aiohttp.ClientSession:
+        # One pooled session for search and enrichment so repeat hosts reuse DNS and TLS.
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, limit_per_host=8, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=60),
+                headers={"User-Agent": "KirokuOutreachBot/1.0"},
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        """Release the shared HTTP session."""
+        http, self._http = self._http, None
+        if http is not None:
+            await http.close()
+
     async def _fetch_text(self, session: aiohttp.ClientSession, url: str) -> str:
         if not url:
             return ""
         if not url.startswith("http://") and not url.startswith("https://"):
             return ""
         try:
-            async with session.get(url, allow_redirects=True) as resp:
+            async with session.get(url, allow_redirects=True, timeout=_FETCH_TIMEOUT) as resp:
                 if resp.status >= 400:
                     return ""
+                # Skip images/PDFs/etc. (aiohttp reports octet-stream when the header is absent, so
+                # only trust content_type when the server actually sent one).
+                if resp.headers.get("Content-Type") and not resp.content_type.startswith(_TEXT_CONTENT_TYPES):
+                    return ""
                 # Avoid giant payloads.
                 raw = await resp.content.read(600_000)
-                return raw.decode("utf-8", errors="ignore")
+                try:
+                    return raw.decode(resp.charset or "utf-8", errors="ignore")
+                except LookupError:
+                    return raw.decode("utf-8", errors="ignore")
         except Exception:
             return ""
 
+    async def _enrich_one(self, sem: asyncio.Semaphore, session: aiohttp.ClientSession, lead: OutreachLead) -> None:
+        async with sem:
+            root = f"https://{lead.domain}" if lead.domain else lead.website_url
+            html = await self._fetch_text(session, root)
+            if not html and lead.website_url and lead.website_url != root:
+                html = await self._fetch_text(session, lead.website_url)
+            # Only scan the page for whichever field is still missing.
+            if not lead.contact_url:
+                lead.contact_url = _find_contact_url(html, root)
+            if not lead.contact_email:
+                lead.contact_email = _pick_best_email(_extract_emails(html))
+
+            # If we found a contact URL, fetch it as a second pass and try again.
+            if not lead.contact_email and lead.contact_url:
+                contact_html = await self._fetch_text(session, lead.contact_url)
+                contact_emails = _extract_emails(contact_html)
+                lead.contact_email = lead.contact_email or _pick_best_email(contact_emails)
+
     async def _enrich_contact(self, leads: list[OutreachLead]) -> list[OutreachLead]:
-        timeout = aiohttp.ClientTimeout(total=25)
-        connector = aiohttp.TCPConnector(limit=8)
-        async with aiohttp.ClientSession(timeout=timeout, connector=connector, headers={"User-Agent": "KirokuOutreachBot/1.0"}) as session:
-            for lead in leads:
-                if lead.contact_email and lead.contact_url:
-                    continue
-                root = f"https://{lead.domain}" if lead.domain else lead.website_url
-                html = await self._fetch_text(session, root)
-                if not html and lead.website_url and lead.website_url != root:
-                    html = await self._fetch_text(session, lead.website_url)
-                emails = _extract_emails(html)
-                lead.contact_url = lead.contact_url or _find_contact_url(html, root)
-                lead.contact_email = lead.contact_email or _pick_best_email(emails)
-
-                # If we found a contact URL, fetch it as a second pass and try again.
-                if not lead.contact_email and lead.contact_url:
-                    contact_html = await self._fetch_text(session, lead.contact_url)
-                    contact_emails = _extract_emails(contact_html)
-                    lead.contact_email = lead.contact_email or _pick_best_email(contact_emails)
+        # Enrich up to 8 leads at once; each lead's own fetches stay sequential.
+        sem = asyncio.Semaphore(8)
+        session = await self._session()
+        await asyncio.gather(
+            *(self._enrich_one(sem, session, lead) for lead in leads if not (lead.contact_email and lead.contact_url))
+        )
         return leads
 
     async def generate_housing_leads(self, count: int, *, city: str = "Tokyo", country: str = "Japan") -> Path:
@@ -387,7 +533,7 @@ class OutreachOps:
 
         provider = (self.config.search_provider or "").strip().lower()
         if provider in {"", "seed", "none"}:
-            leads = self._seed_housing_leads(city=city, country=country)
+            leads = await asyncio.to_thread(self._seed_housing_leads, city=city, country=country)
             if len(leads) < count:
                 raise OutreachOpsError(
                     f"Seed list too small: have {len(leads)} leads, need {count}. "
@@ -395,12 +541,13 @@ class OutreachOps:
                 )
             leads = leads[:count]
             await self._enrich_contact(leads)
-            ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+            ts = _file_stamp()
             out_path = self.config.state_dir / f"leads-housing-{_safe_filename(city)}-{ts}.csv"
-            self._write_csv(out_path, [l.to_row() for l in leads])
+            await asyncio.to_thread(self._write_csv, out_path, [l.to_row() for l in leads])
             return out_path
 
         search = self._search_client()
+        session = await self._session()
 
         queries = [
             f"{city} hotel corporate partnership",
@@ -417,10 +564,10 @@ class OutreachOps:
         seen_domains: set[str] = set()
 
         for q in queries:
-            results = await search.search(q, limit=25)
+            results = await search.search(session, q, limit=25)
             for r in results:
                 domain = _normalize_domain(r.link)
-                if not domain or domain in seen_domains:
+                if "." not in domain or domain in seen_domains:
                     continue
                 seen_domains.add(domain)
 
@@ -452,9 +599,9 @@ class OutreachOps:
         # Best-effort contact enrichment (emails/contact pages).
         await self._enrich_contact(leads)
 
-        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+        ts = _file_stamp()
         out_path = self.config.state_dir / f"leads-housing-{_safe_filename(city)}-{ts}.csv"
-        self._write_csv(out_path, [l.to_row() for l in leads])
+        await asyncio.to_thread(self._write_csv, out_path, [l.to_row() for l in leads])
         return out_path
 
     def _seed_housing_leads(self, *, city: str, country: str) -> list[OutreachLead]:
@@ -506,32 +653,50 @@ class OutreachOps:
     def _load_housing_template(self) -> tuple[str, str]:
         # For now, load from the shared outreach pack if present.
         pack = self.config.website_dir / "sponsorship_first_contact_emails.md"
-        if not pack.exists():
-            raise OutreachOpsError("Missing template file: website/sponsorship_first_contact_emails.md")
+        try:
+            st = pack.stat()
+        except OSError:
+            raise OutreachOpsError("Missing template file: website/sponsorship_first_contact_emails.md") from None
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._template_cache is not None and self._template_cache[0] == stamp:
+            return self._template_cache[1]
 
         text = self._read_text(pack)
-        m = re.search(r"(?ms)^## Template D: Housing Partner.*?^Subject:\\s*(.*?)\\n\\n(.*?)(?=^##\\s)", text)
+        m = _HOUSING_TEMPLATE_RE.search(text)
         if not m:
             raise OutreachOpsError(
                 "Housing template not found in sponsorship_first_contact_emails.md. "
                 "Expected a section header like `## Template D: Housing Partner`."
             )
-        subject = (m.group(1) or "").strip()
-        body = (m.group(2) or "").strip()
+        # Compile to format strings once so each draft is a single format_map call.
+        subject = _to_format_template((m.group(1) or "").strip())
+        body = _to_format_template((m.group(2) or "").strip())
+        self._template_cache = (stamp, (subject, body))
         return subject, body
 
-    def _substitute(self, text: str, values: dict[str, str]) -> str:
-        def repl(match: re.Match[str]) -> str:
-            key = (match.group(1) or "").strip()
-            return str(values.get(key, "") or "")
-
-        return re.sub(r"\\{\\{\\s*([a-zA-Z0-9_]+)\\s*\\}\\}", repl, text)
-
     def _read_csv(self, path: Path) -> list[dict[str, str]]:
         try:
             with path.open("r", encoding="utf-8", newline="") as f:
-                reader = csv.DictReader(f)
-                return [{k: (v or "").strip() for k, v in row.items()} for row in reader]
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    return []
+                # Same shape as DictReader: blank lines skipped, short rows padded with "".
+                width = len(header)
+                pad = [""] * width
+                rows: list[dict[str, str]] = []
+                for row in reader:
+                    if not row:
+                        continue
+                    if len(row) > width:
+                        # Usually a stray comma from a hand edit; refuse rather than drop cells on rewrite.
+                        raise OutreachOpsError(
+                            f"Line {reader.line_num} of {path.name} has {len(row)} fields, expected {width}."
+                        )
+                    rows.append(dict(zip(header, [c.strip() for c in row] + pad)))
+                return rows
+        except OutreachOpsError:
+            raise
         except Exception as exc:
             raise OutreachOpsError(f"Failed reading CSV {path}: {exc}") from exc
 
@@ -539,18 +704,13 @@ class OutreachOps:
         rows_list = list(rows)
         if not rows_list:
             raise OutreachOpsError("Cannot write empty CSV.")
-        fieldnames: list[str] = []
-        for row in rows_list:
-            for k in row.keys():
-                if k not in fieldnames:
-                    fieldnames.append(k)
+        fieldnames = list(dict.fromkeys(k for row in rows_list for k in row))
 
         path.parent.mkdir(parents=True, exist_ok=True)
         with path.open("w", encoding="utf-8", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in rows_list:
-                writer.writerow(row)
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            writer.writerows([row.get(k, "") for k in fieldnames] for row in rows_list)
 
     def draft_housing_emails(self, leads_csv: Path) -> Path:
         self._validate_draft_config()
@@ -574,8 +734,9 @@ class OutreachOps:
                 "cohort_date_window": self.config.cohort_date_window,
                 "cohort_city": self.config.cohort_city,
             }
-            subject = self._substitute(subject_t, values).strip()
-            body = self._substitute(body_t, values).strip()
+            fields = _BlankDefaults(values)
+            subject = subject_t.format_map(fields).strip()
+            body = body_t.format_map(fields).strip()
             drafts.append(
                 OutreachEmailDraft(
                     draft_id=str(idx),
@@ -592,7 +753,7 @@ class OutreachOps:
         if not drafts:
             raise OutreachOpsError("No leads found (empty leads CSV).")
 
-        ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+        ts = _file_stamp()
         out_path = self.config.state_dir / f"outbox-housing-{ts}.csv"
         self._write_csv(out_path, [d.to_row() for d in drafts])
         return out_path
@@ -623,10 +784,23 @@ class OutreachOps:
         suffix = "\n(truncated)" if len(lines) >= limit else ""
         return "Outbox preview:\n" + "\n".join(lines) + suffix
 
+    def _outbox_lock(self, outbox_csv: Path) -> threading.Lock:
+        key = outbox_csv.resolve()
+        with self._outbox_locks_guard:
+            lock = self._outbox_locks.get(key)
+            if lock is None:
+                lock = self._outbox_locks[key] = threading.Lock()
+            return lock
+
     def approve_outbox(self, outbox_csv: Path, *, approve_all: bool = False, first: int = 0, ids: set[str] | None = None) -> int:
         if not approve_all and first <= 0 and not ids:
             raise OutreachOpsError("approve requires one of: --all | --first N | --ids 1,2,3")
 
+        # Held across read-modify-write so a concurrent send's sent_at stamps aren't overwritten.
+        with self._outbox_lock(outbox_csv):
+            return self._approve_outbox_unlocked(outbox_csv, approve_all=approve_all, first=first, ids=ids)
+
+    def _approve_outbox_unlocked(self, outbox_csv: Path, *, approve_all: bool, first: int, ids: set[str] | None) -> int:
         rows = self._read_csv(outbox_csv)
         approved_count = 0
         remaining_first = first
@@ -654,10 +828,11 @@ class OutreachOps:
                 row["approved"] = "yes"
                 approved_count += 1
 
-        self._write_csv(outbox_csv, rows)
+        if approved_count:
+            self._write_csv(outbox_csv, rows)
         return approved_count
 
-    def _smtp_send(self, to_email: str, subject: str, body: str) -> None:
+    def _smtp_connect(self) -> smtplib.SMTP_SSL:
         if not self.config.send_enabled:
             raise OutreachOpsError("Sending is disabled (set OUTREACH_SEND_ENABLED=true).")
         if not (self.config.smtp_host and self.config.smtp_port and self.config.smtp_user and self.config.smtp_password):
@@ -665,6 +840,22 @@ class OutreachOps:
         if not self.config.sender_email:
             raise OutreachOpsError("Missing OUTREACH_SENDER_EMAIL.")
 
+        context = ssl.create_default_context()
+        server = smtplib.SMTP_SSL(self.config.smtp_host, self.config.smtp_port, context=context)
+        try:
+            server.login(self.config.smtp_user, self.config.smtp_password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def _smtp_close(self, server: smtplib.SMTP_SSL) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _smtp_send(self, server: smtplib.SMTP_SSL, to_email: str, subject: str, body: str) -> None:
         msg = EmailMessage()
         from_email = self.config.sender_email or self.config.smtp_user
         from_name = (self.config.sender_name or "").strip()
@@ -673,11 +864,7 @@ class OutreachOps:
         msg["Subject"] = subject
         msg["Reply-To"] = self.config.sender_email
         msg.set_content(body)
-
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(self.config.smtp_host, self.config.smtp_port, context=context) as server:
-            server.login(self.config.smtp_user, self.config.smtp_password)
-            server.send_message(msg)
+        server.send_message(msg)
 
     def send_outbox(
         self,
@@ -686,12 +873,22 @@ class OutreachOps:
         limit: int = 10,
         dry_run: bool = True,
         approved_only: bool = True,
+    ) -> tuple[int, int, int, Path]:
+        # Two sends on the same outbox would both see the same unsent rows and email them twice.
+        with self._outbox_lock(outbox_csv):
+            return self._send_outbox_unlocked(outbox_csv, limit=limit, dry_run=dry_run, approved_only=approved_only)
+
+    def _send_outbox_unlocked(
+        self, outbox_csv: Path, *, limit: int, dry_run: bool, approved_only: bool
     ) -> tuple[int, int, int, Path]:
         rows = self._read_csv(outbox_csv)
         updated: list[dict[str, str]] = []
         attempted = 0
         sent = 0
         skipped_missing_email = 0
+        # One SMTP session (TLS + AUTH) for the whole batch, opened on the first real send.
+        server: smtplib.SMTP_SSL | None = None
+        session_sends = 0
 
         for row in rows:
             row = dict(row)
@@ -717,7 +914,19 @@ class OutreachOps:
             attempted += 1
             try:
                 if not dry_run:
-                    self._smtp_send(row.get("to_email", ""), row.get("subject", ""), row.get("body", ""))
+                    if server is None:
+                        server = self._smtp_connect()
+                        session_sends = 0
+                    try:
+                        self._smtp_send(server, row.get("to_email", ""), row.get("subject", ""), row.get("body", ""))
+                    except smtplib.SMTPServerDisconnected:
+                        # Reconnect on the next row instead of failing the rest of the batch.
+                        server = None
+                        raise
+                    session_sends += 1
+                    if session_sends >= _SMTP_MESSAGES_PER_SESSION:
+                        self._smtp_close(server)
+                        server = None
                 row["sent_at"] = _iso_now() if not dry_run else ""
                 row["last_error"] = ""
                 sent += 0 if dry_run else 1
@@ -726,5 +935,10 @@ class OutreachOps:
 
             updated.append(row)
 
-        self._write_csv(outbox_csv, updated)
+        if server is not None:
+            self._smtp_close(server)
+
+        # Rows are copied before edits, so this spots no-op runs (e.g. a repeat dry run).
+        if updated != rows:
+            self._write_csv(outbox_csv, updated)
         return attempted, sent, skipped_missing_email, outbox_csv